@@ -23,6 +23,7 @@ from multiprocessing import Process
 from os import getenv, listdir, makedirs, name, path, system, remove
 from subprocess import PIPE, call
 from sys import exc_info
+from time import monotonic
 from traceback import format_exc
 from typing import Union
 
@@ -31,6 +32,7 @@ from disnake import (
     ApplicationCommandInteraction,
     Colour,
     Forbidden,
+    Guild,
     Intents,
     Member,
     Message,
@@ -120,10 +122,20 @@ class Omnitron(Bot):
             ]
         )
         self._extensions = [f for f in dirs]
+
+        # Every message goes through these stages once, the cogs add their own ones
+        self.pipeline = MessagePipeline()
+        self.pipeline.add_stage("prefix", self.prefix_stage)
+        self.pipeline.add_stage("commands", self.commands_stage)
+        # The commands invoked by the pipeline, they can wait for a long time on the members answers
+        self.pending_commands = set()
+
         self.load_extensions()
         self.session = ClientSession(loop=self.loop)
 
         self.starting = True
+        self.ready_guilds = set()
+        self.guild_last_access = {}
         self.model = Model.setup()
         self.last_check = None
 
@@ -137,6 +149,7 @@ class Omnitron(Bot):
         info("Database loaded")
 
         self.configs = {}
+        self.runtime_configs = {}
         self.moderators = {}
         self.djs = {}
         self.playlists = {}
@@ -158,28 +171,28 @@ class Omnitron(Bot):
     """ EVENTS """
 
     async def on_message_command(self, inter: ApplicationCommandInteraction):
-        self.user_repo.add_command_count(
+        await self.user_repo.aio.add_command_count(
             inter.guild.id,
             inter.author.id,
             get_qualified_name_from_interaction(inter),
         )
 
     async def on_user_command(self, inter: ApplicationCommandInteraction):
-        self.user_repo.add_command_count(
+        await self.user_repo.aio.add_command_count(
             inter.guild.id,
             inter.author.id,
             get_qualified_name_from_interaction(inter),
         )
 
     async def on_slash_command_completion(self, inter: ApplicationCommandInteraction):
-        self.user_repo.add_command_count(
+        await self.user_repo.aio.add_command_count(
             inter.guild.id,
             inter.author.id,
             get_qualified_name_from_interaction(inter),
         )
 
     async def on_command_completion(self, ctx: Context):
-        self.user_repo.add_command_count(
+        await self.user_repo.aio.add_command_count(
             ctx.guild.id, ctx.author.id, ctx.command.qualified_name
         )
 
@@ -257,17 +270,102 @@ class Omnitron(Bot):
             message.is_system()
             or message.author.bot
             or not message.guild
-            or self.starting
+            or message.guild.id not in self.ready_guilds
         ):
             return
 
-        prefix = self.utils_class.get_guild_pre(message)
+        await self.pipeline.process(message)
+
+    """ MESSAGE STAGES """
+
+    async def prefix_stage(self, state: "MessageState") -> None:
+        """Checks if the message starts with the guild prefix and replies with it when the bot is only mentioned"""
+        message = state.message
+        state.prefix = self.utils_class.get_guild_pre(message)[0]
+        state.is_command = message.content.lower().startswith(state.prefix.lower())
+
+        if (
+            not state.is_command
+            and self.user in message.mentions
+            and len(message.content) - len(f"{self.user.mention}") in (0, 1)
+        ):
+            try:
+                msg = await message.channel.send(
+                    f"ℹ️ - {message.author.mention} - Here's my prefix for this guild: `{state.prefix}`!"
+                )
+            except Forbidden as f:
+                f.text = f"⚠️ - I don't have the right permissions to send messages in the channel {message.channel.mention} (message: `ℹ️ - {message.author.mention} - Here's my prefix for this guild: `{state.prefix}`!`)!"
+                raise
+
+            try:
+                await msg.add_reaction("👀")
+            except Forbidden as f:
+                f.text = f"⚠️ - I don't have the right permissions to add reactions in the channel {message.channel.mention} (message: {msg.jump_url}, reaction: 👀)!"
+                raise
+
+    async def commands_stage(self, state: "MessageState") -> None:
+        """Builds the context of the messages starting with the prefix and invokes their command in the background, the next stages don't wait for it"""
+        if not state.is_command:
+            return
 
-        if message.content.lower().startswith(prefix[0].lower()):
-            await self.process_commands(message)
+        ctx = state.ctx = await self.get_context(state.message)
+
+        # The replies don't stop the next stages
+        if ctx.command is None:
+            await ctx.reply(
+                f"ℹ️ - This command doesn't exist or is deactivated! Command: `{state.message.content[len(state.prefix)::]}`",
+                delete_after=15,
+            )
+            return
+        elif (
+            not self.runtime_configs[ctx.guild.id].allows_commands(ctx.channel.id)
+            and not ctx.author.guild_permissions.administrator
+        ):
+            await ctx.reply(
+                f"⛔ - Commands are not allowed in this channel!",
+                delete_after=15,
+            )
+            return
+
+        task = self.loop.create_task(self.invoke(ctx))
+        self.pending_commands.add(task)
+        task.add_done_callback(self.pending_commands.discard)
 
     """ METHOD(S) """
 
+    def dispatch(self, event_name: str, *args, **kwargs) -> None:
+        """Loads the state of the event's guild before dispatching it if the guild isn't loaded"""
+        guild = self.get_event_guild(*args)
+
+        if guild is None or guild.id in self.ready_guilds:
+            if guild is not None:
+                self.guild_last_access[guild.id] = monotonic()
+            return super().dispatch(event_name, *args, **kwargs)
+
+        self.utils_class.queue_guild_event(guild, event_name, args, kwargs)
+
+    def get_event_guild(self, *args) -> Union[Guild, None]:
+        """Returns the guild an event is about, None for the guild events which manage the guild themselves"""
+        if not args or isinstance(args[0], Guild):
+            return None
+
+        guild = getattr(args[0], "guild", None)
+
+        if isinstance(guild, Guild):
+            return guild
+
+        guild_id = getattr(args[0], "guild_id", None)
+        return self.get_guild(guild_id) if isinstance(guild_id, int) else None
+
+    async def close(self) -> None:
+        """Closes the bot, writes the buffered state and waits for the pending database calls"""
+        await super().close()
+        # The voice time is counted into the counters, they are flushed after it
+        self.user_repo.voice.stop()
+        self.user_repo.counters.stop()
+        self.user_repo.xp.stop()
+        self.model.close()
+
     async def handle_error(
         self, source: Union[Context, ApplicationCommandInteraction], _error
     ):
@@ -317,28 +415,6 @@ class Omnitron(Bot):
             f.text = f"⚠️ - I don't have the right permissions to send messages in the channel {source.channel.mention} (message (replying to {source.author}): `{resp}`)!"
             raise
 
-    async def process_commands(self, message: Message):
-        """This function processes the commands that the user has sent"""
-        await self.wait_until_ready()
-        ctx = await self.get_context(message=message)
-
-        if ctx.command is None:
-            return await ctx.reply(
-                f"ℹ️ - This command doesn't exist or is deactivated! Command: `{message.content[len(self.utils_class.get_guild_pre(message)[0])::]}`",
-                delete_after=15,
-            )
-        elif (
-            "commands_channels" in self.configs[ctx.guild.id]
-            and ctx.channel.id not in self.configs[ctx.guild.id]["commands_channels"]
-            and not ctx.author.guild_permissions.administrator
-        ):
-            return await ctx.reply(
-                f"⛔ - Commands are not allowed in this channel!",
-                delete_after=15,
-            )
-
-        await self.invoke(ctx)
-
     def load_extensions(self, cogs: Context = None, path: str = "cogs."):
         """Loads the default set of extensions or a seperate one if given"""
         for extension in cogs or self._extensions:
@@ -401,6 +477,7 @@ if __name__ == "__main__":
         OWNER_ID,
     )
     from data.Database import Main, Config, Poll, Ticket, User
+    from data.pipeline import MessagePipeline, MessageState
 
     load_dotenv(path.join(".", ".env"))  # Load data from the .env file
 
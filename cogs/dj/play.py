@@ -272,10 +272,8 @@ class Dj(Cog, name="dj.play"):
                             f"⚠️ - {source.author.mention} - Please be in a non-AFK voice channel!",
                             ephemeral=True,
                         )
-                elif (
-                    "music_channels" in self.bot.configs[source.guild.id]
-                    and source.author.voice.channel.id
-                    not in self.bot.configs[source.guild.id]["music_channels"]
+                elif not self.bot.runtime_configs[source.guild.id].allows_music(
+                    source.author.voice.channel.id
                 ):
                     if isinstance(source, Context):
                         return await source.reply(
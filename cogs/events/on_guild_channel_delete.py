@@ -64,6 +64,8 @@ class Events(Cog, name="events.on_guild_channel_delete"):
             if not self.bot.configs[channel.guild.id]["xp_gain_channels"]:
                 del self.bot.configs[channel.guild.id]["xp_gain_channels"]
 
+        self.bot.utils_class.build_runtime_config(channel.guild.id)
+
         if (
             "notify_channel" in self.bot.configs[channel.guild.id]["xp"]
             and self.bot.configs[channel.guild.id]["xp"]["notify_channel"] == channel
@@ -82,6 +82,10 @@ class Events(Cog, name="events.on_guild_role_delete"):
             del self.bot.configs[role.guild.id]["select2role"]["selects"][title]
             resp = f"⚠️ - Someone just deleted a role corresponding to one of the existing select to role (select: `{title}`), therefore the role has been deleted from the list, (please use the command `{self.bot.utils_class.get_guild_pre(role.guild.id)[0]}select_to_role resolve` to resolve the feature)!!"
 
+        # The role may have been a moderator or dj one or have given the administrator permission
+        self.bot.utils_class.build_runtime_config(role.guild.id)
+        self.bot.utils_class.permissions.invalidate(role.guild.id)
+
         if resp:
             await self.bot.utils_class.send_message_to_mods(
                 resp + f"\nThe role was `{role.name}` (ID: `{role.id}`)",
@@ -0,0 +1,21 @@
+from disnake import Role
+from disnake.ext.commands import Cog
+
+from bot import Omnitron
+from data import Utils
+
+
+class Events(Cog, name="events.on_guild_role_update"):
+    def __init__(self, bot: Omnitron):
+        self.bot = bot
+
+    @Cog.listener()
+    @Utils.check_bot_starting()
+    async def on_guild_role_update(self, before: Role, after: Role):
+        """When the administrator permission of a role changes, forget the cached moderator and dj statuses of the guild"""
+        if before.permissions.administrator != after.permissions.administrator:
+            self.bot.utils_class.permissions.invalidate(after.guild.id)
+
+
+def setup(bot: Omnitron):
+    bot.add_cog(Events(bot))
@@ -1,4 +1,3 @@
-from asyncio import sleep
 from disnake import Member
 from disnake.ext.commands import Cog
 from time import time
@@ -13,42 +12,44 @@ class Events(Cog, name="events.on_member_join"):
 
     @Cog.listener()
     @Utils.check_bot_starting()
-    async def on_member_join(self, member: Member, tries: int = 0):
+    async def on_member_join(self, member: Member):
         """When a member joins a guild, add him to the database and if the mute_on_join option is on then mute him for a limited amount of time"""
         await self.bot.wait_until_ready()
 
-        if member.bot:
+        if member.bot or not await self.bot.utils_class.wait_guild_ready(
+            member.guild.id
+        ):
             return
 
-        self.bot.user_repo.update_user(member.guild.id, member.id, f"{member}")
+        await self.bot.user_repo.aio.update_user(
+            member.guild.id, member.id, f"{member}"
+        )
         roles = []
 
-        try:
-            if "mute_on_join" in self.bot.configs[member.guild.id]:
-                roles += [self.bot.configs[member.guild.id]["muted_role"]]
-                await member.add_roles(*roles, reason="Has just joined the server.")
-                self.bot.user_repo.mute_user(
+        if "mute_on_join" in self.bot.configs[member.guild.id]:
+            roles += [self.bot.configs[member.guild.id]["muted_role"]]
+            await member.add_roles(*roles, reason="Has just joined the server.")
+            await self.bot.user_repo.aio.mute_user(
+                member.guild.id,
+                member.id,
+                self.bot.configs[member.guild.id]["mute_on_join"]["duration"],
+                time(),
+                f"{self.bot.user}",
+                "joined the server",
+            )
+            db_user = await self.bot.user_repo.aio.get_user(
+                member.guild.id, member.id
+            )
+            self.bot.tasks[member.guild.id]["mute_completions"][
+                member.id
+            ] = self.bot.utils_class.task_launcher(
+                self.bot.utils_class.mute_completion,
+                (
+                    db_user,
                     member.guild.id,
-                    member.id,
-                    self.bot.configs[member.guild.id]["mute_on_join"]["duration"],
-                    time(),
-                    f"{self.bot.user}",
-                    "joined the server",
-                )
-                self.bot.tasks[member.guild.id]["mute_completions"][
-                    member.id
-                ] = self.bot.utils_class.task_launcher(
-                    self.bot.utils_class.mute_completion,
-                    (
-                        self.bot.user_repo.get_user(member.guild.id, member.id),
-                        member.guild.id,
-                    ),
-                    count=1,
-                )
-        except KeyError:
-            if tries < 3:
-                await sleep(5)
-                await self.on_member_join(member, tries=tries + 1)
+                ),
+                count=1,
+            )
 
 
 def setup(bot: Omnitron):
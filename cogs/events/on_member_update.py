@@ -0,0 +1,21 @@
+from disnake import Member
+from disnake.ext.commands import Cog
+
+from bot import Omnitron
+from data import Utils
+
+
+class Events(Cog, name="events.on_member_update"):
+    def __init__(self, bot: Omnitron):
+        self.bot = bot
+
+    @Cog.listener()
+    @Utils.check_bot_starting()
+    async def on_member_update(self, before: Member, after: Member):
+        """When the roles of a member change, forget his cached moderator and dj statuses"""
+        if before.roles != after.roles:
+            self.bot.utils_class.permissions.invalidate(after.guild.id, after.id)
+
+
+def setup(bot: Omnitron):
+    bot.add_cog(Events(bot))
@@ -1,87 +1,66 @@
-from asyncio import sleep
-from disnake import Forbidden, Message
 from disnake.ext.commands import Cog
 
 from bot import Omnitron
-from data import Utils, Xp_class
+from data import Xp_class
+from data.cooldowns import Cooldowns, XP_COOLDOWN
+from data.pipeline import MessageState
 
 
 class Events(Cog, name="events.on_message"):
     def __init__(self, bot: Omnitron):
         self.bot = bot
-        self.limitation = []
+        self.cooldowns = Cooldowns()
         self.xp_class = Xp_class(bot)
+        self.stages = {
+            "counters": self.counters_stage,
+            "invites": self.invites_stage,
+            "xp": self.xp_stage,
+        }
 
-    """ EVENT """
+        for name, stage in self.stages.items():
+            self.bot.pipeline.add_stage(name, stage)
 
-    @Cog.listener()
-    @Utils.check_bot_starting()
-    async def on_message(self, message: Message, tries: int = 0):
-        """When a message is sent, if the prevent_invites option is on check if there is an invitation link to another discord server in the message and is the xp is on then manage the user's xp"""
-        await self.bot.wait_until_ready()
-        if message.is_system() or message.author.bot or not message.guild:
-            return
+    def cog_unload(self):
+        for name in self.stages:
+            self.bot.pipeline.remove_stage(name)
+
+    """ STAGES """
 
-        ctx = await self.bot.get_context(message=message)
-        self.bot.user_repo.add_messages_count(
-            message.guild.id, message.author.id, message.channel.id
+    async def counters_stage(self, state: MessageState) -> None:
+        """Counts the message of the member in the channel"""
+        await self.bot.user_repo.aio.add_messages_count(
+            state.message.guild.id, state.message.author.id, state.message.channel.id
         )
 
-        if (
-            ctx.message.mentions
-            and self.bot.user in ctx.message.mentions
-            and (
-                len(ctx.message.content) == len(f"{self.bot.user.mention}")
-                or len(ctx.message.content) == len(f"{self.bot.user.mention}") + 1
-            )
+    async def invites_stage(self, state: MessageState) -> bool:
+        """If the prevent_invites option is on, checks if there is an invitation link to another discord server in the message and stops there if there is one"""
+        if "prevent_invites" in self.bot.configs[state.message.guild.id]:
+            return await self.bot.utils_class.check_invite(state.message)
+
+        return False
+
+    async def xp_stage(self, state: MessageState) -> None:
+        """If the xp is on, manages the xp of the member unless it is in its cooldown"""
+        message = state.message
+
+        if not self.bot.configs[message.guild.id]["xp"]["is_on"]:
+            return
+
+        xp_gain_channels = self.bot.runtime_configs[message.guild.id].xp_gain_channels
+
+        # Only the configured text channels give xp, if there are any
+        if xp_gain_channels is not None and (
+            "TextChannel" not in xp_gain_channels
+            or xp_gain_channels["TextChannel"]
+            and message.channel.id not in xp_gain_channels["TextChannel"]
+        ):
+            return
+
+        if self.cooldowns.hit(
+            (message.guild.id, message.author.id),
+            self.bot.configs[message.guild.id]["xp"].get("cooldown", XP_COOLDOWN),
         ):
-            try:
-                msg = await ctx.send(
-                    f"ℹ️ - {ctx.author.mention} - Here's my prefix for this guild: `{self.bot.utils_class.get_guild_pre(ctx.message)[0]}`!"
-                )
-            except Forbidden as f:
-                f.text = f"⚠️ - I don't have the right permissions to send messages in the channel {ctx.channel.mention} (message: `ℹ️ - {ctx.author.mention} - Here's my prefix for this guild: `{self.bot.utils_class.get_guild_pre(ctx.message)[0]}`!`)!"
-                raise
-
-            try:
-                await msg.add_reaction("👀")
-            except Forbidden as f:
-                f.text = f"⚠️ - I don't have the right permissions to add reactions in the channel {ctx.channel.mention} (message: {msg.jump_url}, reaction: 👀)!"
-                raise
-
-        try:
-            if "prevent_invites" in self.bot.configs[message.guild.id]:
-                await self.bot.utils_class.check_invite(ctx)
-            if self.bot.configs[message.guild.id]["xp"]["is_on"]:
-                if (
-                    "xp_gain_channels" not in self.bot.configs[message.guild.id]
-                    or "xp_gain_channels" in self.bot.configs[message.guild.id]
-                    and (
-                        message.channel.id
-                        in self.bot.configs[message.guild.id]["xp_gain_channels"][
-                            "TextChannel"
-                        ]
-                        or not self.bot.configs[message.guild.id]["xp_gain_channels"][
-                            "TextChannel"
-                        ]
-                    )
-                ):
-                    _id = f"{message.guild.id}.{message.author.id}"
-                    if _id not in self.limitation:
-                        await self.xp_class.manage_xp(message.author, "message")
-                        self.limitation.append(_id)
-                        await self.cooldown_messages(_id)
-        except KeyError:
-            if tries < 3:
-                await sleep(5)
-                await self.on_message(message, tries=tries + 1)
-
-    """ METHODS """
-
-    async def cooldown_messages(self, _id: str):
-        """This method manage the messages cooldown"""
-        await sleep(5)
-        del self.limitation[self.limitation.index(_id)]
+            await self.xp_class.manage_xp(message.author, "message")
 
 
 def setup(bot: Omnitron):
@@ -25,8 +25,7 @@ class Events(Cog, name="events.on_raw_message_edit"):
             if message.is_system() or message.author.bot:
                 return
 
-            ctx = await self.bot.get_context(message=message)
-            await self.bot.utils_class.check_invite(ctx)
+            await self.bot.utils_class.check_invite(message)
 
 
 def setup(bot: Omnitron):
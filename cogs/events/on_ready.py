@@ -1,6 +1,9 @@
-from logging import info
+from asyncio import Semaphore, gather
+from logging import error, info
+from os import getenv
+from time import perf_counter
 
-from disnake import Activity, ActivityType
+from disnake import Activity, ActivityType, Guild
 from disnake.ext.commands import Cog
 
 from bot import Omnitron
@@ -13,29 +16,59 @@ class Events(Cog, name="events.on_ready"):
     @Cog.listener()
     async def on_ready(self):
         """Check on start if any guilds that the bot is in are not in the DB else initialise moderators list for every guild in the DB"""
-        db_guilds = set([int(k) for k in self.bot.main_repo.get_guilds().keys()])
-        guilds = set(self.bot.guilds)
-
-        for guild in guilds:
-
-            """GUILDS CHECK"""
-
-            if guild.id not in db_guilds:
-                self.bot.main_repo.create_guild(
-                    guild.id, guild.name, f"{guild.owner}"
-                )  # If guild is not in DB, create it
+        start = perf_counter()
 
-            db_guild = self.bot.main_repo.get_guild(guild.id)
-
-            if guild.id in db_guilds and not db_guild["present"]:
-                self.bot.main_repo.update_guild(guild.id, {"present": True})
-            elif not db_guild["present"]:
-                continue
+        # Only the ids of the guilds are read, the state of each guild is read once by its initialization
+        db_guild_ids = set(await self.bot.main_repo.aio.get_guild_ids())
+        guilds = set(self.bot.guilds)
+        await self.bot.main_repo.aio.set_guilds_present(
+            [guild.id for guild in guilds if guild.id in db_guild_ids]
+        )
+        semaphore = Semaphore(int(getenv("GUILD_INIT_CONCURRENCY", 10)))
+        initialized = 0
+
+        async def init(guild: Guild):
+            nonlocal initialized
+
+            async with semaphore:
+                guild_start = perf_counter()
+                await self.init_guild(guild, guild.id in db_guild_ids)
+                initialized += 1
+                info(
+                    f"Guild {guild.name} ({guild.id}) initialized in {perf_counter() - guild_start:.2f}s ({initialized}/{len(guilds)})"
+                )
+
+        results = await gather(
+            *[init(guild) for guild in guilds], return_exceptions=True
+        )
 
-            await self.bot.utils_class.init_guild(guild)
+        for guild, result in zip(guilds, results):
+            if isinstance(result, Exception):
+                error(
+                    f"Couldn't initialize the guild {guild.name} ({guild.id}): {type(result).__name__}: {result}"
+                )
+
+        # Members already in a voice channel, their sessions are resumed from the last checkpoint
+        await self.bot.model.run(
+            self.bot.user_repo.voice.restore,
+            {
+                (guild.id, member.id): channel.id
+                for guild in guilds
+                for channel in guild.voice_channels
+                if channel != guild.afk_channel
+                for member in channel.members
+                if not member.bot
+            },
+        )
+        self.bot.user_repo.voice.start()
+        self.bot.user_repo.counters.start()
+        self.bot.user_repo.xp.start()
+        # Role syncs interrupted by a restart
+        await self.bot.utils_class.role_sync.restore()
+        self.bot.utils_class.start_guilds_eviction()
 
         print("Omnitron is ready.")
-        info("Omnitron successfully started")
+        info(f"Omnitron successfully started in {perf_counter() - start:.2f}s")
 
         await self.bot.change_presence(
             activity=Activity(type=ActivityType.listening, name=f"Ping me for prefix")
@@ -43,6 +76,32 @@ class Events(Cog, name="events.on_ready"):
 
         self.bot.starting = False
 
+    async def init_guild(self, guild: Guild, stored: bool):
+        """GUILDS CHECK"""
+
+        if not stored:
+            return await self.bot.main_repo.aio.create_guild(
+                guild.id, guild.name, f"{guild.owner}"
+            )  # If guild is not in DB, create it
+
+        # The guilds with timers are loaded from the snapshot read for the check, the other ones on their first event or command
+        db_guild = await self.bot.main_repo.aio.get_guild_state(guild.id)
+
+        if self.has_timers(db_guild):
+            await self.bot.utils_class.load_guild(guild, db_guild)
+
+    @staticmethod
+    def has_timers(db_guild: dict) -> bool:
+        """Checks if the guild has mutes, bans or polls to complete which need its state loaded"""
+        polls = db_guild.get("polls") or {}
+
+        return any(poll != "old" for poll in polls) or any(
+            db_user.get("muted")
+            or "ban" in db_user
+            and db_user["ban"]["duration"] != "all Eternity"
+            for db_user in (db_guild.get("users") or {}).values()
+        )
+
     def cog_unload(self):
         """Cog unload handler. This removes any event hooks that were registered."""
         self.bot.lavalink_event_hooks.clear()
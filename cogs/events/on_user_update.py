@@ -19,8 +19,9 @@ class Events(Cog, name="events.on_user_update"):
             return
 
         if f"{before}" != f"{after}":
-            for guild in set(after.mutual_guilds):
-                self.bot.user_repo.update_user(guild.id, after.id, f"{after}")
+            async with self.bot.user_repo.batch():
+                for guild in set(after.mutual_guilds):
+                    self.bot.user_repo.update_user(guild.id, after.id, f"{after}")
 
 
 def setup(bot: Omnitron):
@@ -1,4 +1,7 @@
-from time import time
+from collections import defaultdict
+from logging import error
+from os import getenv
+from time import monotonic
 
 from disnake import Member, VoiceState
 from disnake.ext.commands import Cog
@@ -10,10 +13,17 @@ from data import Utils, Xp_class
 class Events(Cog, name="events.on_voice_state_update"):
     def __init__(self, bot: Omnitron):
         self.bot = bot
-        self.voice_intervals = {}
-        self.count_intervals = {}
+        # Next time each tracked member (by guild and member ids) earns voice xp
+        self.voice_sessions = {}
+        self.voice_xp_interval = float(getenv("VOICE_XP_INTERVAL", 420))
+        self.voice_xp_tick = float(getenv("VOICE_XP_TICK", 60))
+        self.voice_ticker = None
         self.xp_class = Xp_class(bot)
 
+    def cog_unload(self):
+        if self.voice_ticker is not None:
+            self.voice_ticker.cancel()
+
     """ EVENT """
 
     @Cog.listener()
@@ -24,61 +34,52 @@ class Events(Cog, name="events.on_voice_state_update"):
         if member.bot:
             return
 
-        _id = f"{member.guild.id}.{member.id}"
+        session = (member.guild.id, member.id)
 
-        if _id in self.count_intervals:
-            self.bot.user_repo.add_voice_time(
-                member.guild.id,
-                member.id,
-                self.count_intervals[_id]["voice_channel"].id,
-                time() - self.count_intervals[_id]["joining_time"],
-            )
+        # Mute, deaf and stream toggles don't change the channel, the voice time is only counted on channel changes
+        if after.channel != before.channel:
+            if after.channel and after.channel != member.guild.afk_channel:
+                await self.bot.model.run(
+                    self.bot.user_repo.voice.join,
+                    member.guild.id,
+                    member.id,
+                    after.channel.id,
+                )
+            elif before.channel:
+                await self.bot.model.run(
+                    self.bot.user_repo.voice.leave, member.guild.id, member.id
+                )
 
-            del self.count_intervals[_id]
+        xp_gain_channels = self.bot.runtime_configs[member.guild.id].xp_gain_channels
 
         if after.channel:
-            if member.voice.channel != member.guild.afk_channel:
-                self.count_intervals[_id] = {
-                    "joining_time": time(),
-                    "voice_channel": after.channel,
-                }
-
-            if _id not in self.voice_intervals:
+            if session not in self.voice_sessions:
                 if self.bot.configs[member.guild.id]["xp"]["is_on"]:
                     if (
-                        "xp_gain_channels" in self.bot.configs[member.guild.id]
-                        and "VoiceChannel"
-                        in self.bot.configs[member.guild.id]["xp_gain_channels"]
+                        xp_gain_channels is not None
+                        and "VoiceChannel" in xp_gain_channels
                         and (
-                            not self.bot.configs[member.guild.id]["xp_gain_channels"][
-                                "VoiceChannel"
-                            ]
-                            or after.channel.id
-                            in self.bot.configs[member.guild.id]["xp_gain_channels"][
-                                "VoiceChannel"
-                            ]
+                            not xp_gain_channels["VoiceChannel"]
+                            or after.channel.id in xp_gain_channels["VoiceChannel"]
                         )
                     ):
-                        self.voice_intervals[_id] = self.bot.utils_class.task_launcher(
-                            self.vocal_interval, (member,), minutes=7
-                        )
+                        # The first voice xp is given on the next tick
+                        self.voice_sessions[session] = monotonic()
+
+                        if self.voice_ticker is None:
+                            self.voice_ticker = self.bot.utils_class.task_launcher(
+                                self.voice_xp_ticker, (), seconds=self.voice_xp_tick
+                            )
             elif (
                 member.voice.channel == member.guild.afk_channel
-                or "xp_gain_channels" in self.bot.configs[member.guild.id]
-                and "VoiceChannel"
-                in self.bot.configs[member.guild.id]["xp_gain_channels"]
-                and self.bot.configs[member.guild.id]["xp_gain_channels"][
-                    "VoiceChannel"
-                ]
-                and after.channel.id
-                not in self.bot.configs[member.guild.id]["xp_gain_channels"][
-                    "VoiceChannel"
-                ]
+                or xp_gain_channels is not None
+                and "VoiceChannel" in xp_gain_channels
+                and xp_gain_channels["VoiceChannel"]
+                and after.channel.id not in xp_gain_channels["VoiceChannel"]
             ):
-                self.voice_intervals.pop(_id).cancel()
+                del self.voice_sessions[session]
         else:
-            if _id in self.voice_intervals:
-                self.voice_intervals.pop(_id).cancel()
+            self.voice_sessions.pop(session, None)
 
         if before.channel is not None and after.channel != before.channel:
             if not [m for m in before.channel.members if not m.bot]:
@@ -89,9 +90,37 @@ class Events(Cog, name="events.on_voice_state_update"):
 
     """ METHOD(S) """
 
-    async def vocal_interval(self, member: Member):
-        """This method manage the vocal xp cooldown"""
-        await self.xp_class.manage_xp(member, "vocal")
+    async def voice_xp_ticker(self):
+        """Gives the voice xp to the tracked members whose interval elapsed, the eligibility being checked once per channel"""
+        now = monotonic()
+        channels = defaultdict(list)
+
+        for session, next_xp in list(self.voice_sessions.items()):
+            if next_xp > now:
+                continue
+
+            guild = self.bot.get_guild(session[0])
+            member = guild.get_member(session[1]) if guild else None
+
+            if not member or not member.voice or session[0] not in self.bot.configs:
+                del self.voice_sessions[session]
+                continue
+
+            self.voice_sessions[session] = now + self.voice_xp_interval
+            channels[member.voice.channel].append(member)
+
+        for channel, members in channels.items():
+            if len([m for m in channel.members if not m.bot]) < 2:
+                continue
+
+            for member in members:
+                try:
+                    await self.xp_class.award_xp(member, "vocal")
+                except Exception as e:
+                    # A failing member mustn't stop the ticker of every session
+                    error(
+                        f"Couldn't give the voice xp to {member} ({member.guild.id}): {type(e).__name__}: {e}"
+                    )
 
 
 def setup(bot: Omnitron):
@@ -1,8 +1,9 @@
 from inspect import Parameter
-from typing import Union
+from typing import Literal, Union
 
 from disnake import (
     Embed,
+    Guild,
     GuildCommandInteraction,
     Member,
     NotFound,
@@ -18,11 +19,13 @@ from disnake.ext.commands import (
     slash_command,
 )
 from disnake.ext.commands.errors import MissingRequiredArgument
-from numpy import isnan
-from pandas import DataFrame
 
 from bot import Omnitron
 from data import Utils, Xp_class
+from data.xp_curve import xp_to_next_level
+
+# Number of days ranked by the leaderboard periods
+PERIODS = {"week": 7, "month": 30}
 
 
 class Miscellaneous(Cog, name="misc.xp"):
@@ -524,7 +527,7 @@ class Miscellaneous(Cog, name="misc.xp"):
             )  # If the member is at the max level, display the message
         else:
             resp = (
-                f"ℹ️ - {source.author.mention} - {'You only have' if member.id == source.author.id else 'Only'} `{(5 * (db_user['level'] ^ 2) + 50 * db_user['level'] + 100) - db_user['xp']}` of xp left before "
+                f"ℹ️ - {source.author.mention} - {'You only have' if member.id == source.author.id else 'Only'} `{xp_to_next_level(db_user['level']) - db_user['xp']}` of xp left before "
                 + (
                     "you reach"
                     if member.id == source.author.id
@@ -555,8 +558,8 @@ class Miscellaneous(Cog, name="misc.xp"):
         name="leaderboard",
         aliases=["ranking", "top"],
         brief="👑",
-        usage="(me) (all)",
-        description="Displays the top 10 members of the server or your own rank (possibility to display the rank of the moderators)!",
+        usage="(me) (all) (week|month)",
+        description="Displays the top 10 members of the server or your own rank (possibility to display the rank of the moderators and the ranking of the week or of the month)!",
     )
     @max_concurrency(1, per=BucketType.guild)
     async def xp_leaderboard_command(
@@ -570,23 +573,14 @@ class Miscellaneous(Cog, name="misc.xp"):
         ctx: :class:`disnake.ext.commands.GuildCommandInteraction`
             The command context
         options: :class:`Utils.to_lower` optional
-            The command options -> me if you want to show only your rank -> all if you want to include everyone in the server (even the moderators)
+            The command options -> me if you want to show only your rank -> all if you want to include everyone in the server (even the moderators) -> week or month if you want the ranking of the xp gained during the last 7 or 30 days
         """
-        if options:
-            options = options.split(" ")
-
-        me = False
-        mods = False
-
-        if options and options[0] == "me":
-            me = True
-            if len(options) > 1 and options[1] == "all":
-                mods = True
-        else:
-            if options and options[0] == "all":
-                mods = True
+        options = set(options.split(" ")) if options else set()
+        period = (
+            "week" if "week" in options else "month" if "month" in options else "all"
+        )
 
-        await self.handle_leaderboard(ctx, me, mods)
+        await self.handle_leaderboard(ctx, "me" in options, "all" in options, period)
 
     @xp_slash_group.sub_command(
         name="leaderboard",
@@ -594,7 +588,11 @@ class Miscellaneous(Cog, name="misc.xp"):
     )
     @max_concurrency(1, per=BucketType.guild)
     async def xp_leaderboard_command(
-        self, inter: GuildCommandInteraction, me: bool = False, mods: bool = False
+        self,
+        inter: GuildCommandInteraction,
+        me: bool = False,
+        mods: bool = False,
+        period: Literal["all", "week", "month"] = "all",
     ):
         """
         This command displays the top 10 members of the server or your own rank (possibility to display the rank of the moderators)!
@@ -607,14 +605,17 @@ class Miscellaneous(Cog, name="misc.xp"):
             Only displays your ranking
         mods: :class:`bool` optional
             Includes the mods in the ranking
+        period: :class:`str` optional
+            Ranks the xp gained during the last 7 (week) or 30 (month) days
         """
-        await self.handle_leaderboard(inter, me, mods)
+        await self.handle_leaderboard(inter, me, mods, period)
 
     async def handle_leaderboard(
         self,
         source: Union[Context, GuildCommandInteraction],
         me: bool = False,
         mods: bool = False,
+        period: str = "all",
     ):
         """Command that displays the top 10 members of the server with the highest xp
 
@@ -623,42 +624,41 @@ class Miscellaneous(Cog, name="misc.xp"):
         ctx -- The context object
         options -- The options to display the top 10 members with (defaults to None)
         """
+        if period in PERIODS:
+            return await self.handle_period_leaderboard(source, me, mods, period)
 
-        df_users = DataFrame.from_dict(
-            data=self.bot.user_repo.get_users(source.guild.id),
-            orient="index",
-            columns=["name", "prestige", "level", "xp"],
-        )
-        df_users.index = df_users.index.astype(int)
-        df_users = (
-            df_users.sort_values(["xp"], ascending=False, kind="mergesort")
-            .sort_values(["level"], ascending=False, kind="mergesort")
-            .sort_values(
-                ["prestige"], ascending=False, na_position="last", kind="mergesort"
-            )
-        )  # Sort the dataframe by xp < level < prestige
+        ranking = await self.bot.user_repo.aio.get_ranking(source.guild.id)
         add = "of the server *(not including moderators)*"
 
         if me:
-            x = 1
-            for df_user in df_users.index.values:
-                if mods or self.bot.utils_class.is_mod(source.author, self.bot):
-                    if df_user == source.author.id:
-                        if mods or self.bot.utils_class.is_mod(source.author, self.bot):
-                            add = "of the server *(including moderators)*"
-
-                        if isinstance(source, Context):
-                            await source.send(
-                                f"{source.author.mention} - You are in the `{x}{'st' if x == 1 else ('nd' if x == 2 else 'th')}` place {add}! Keep it up! - **Prestige:** {df_users['prestige'][df_user] if not isnan(df_users['prestige'][df_user]) else 0} - **Level:** {df_users['level'][df_user]} - **XP:** {df_users['xp'][df_user]}"
-                            )
-                        else:
-                            await source.response.send_message(
-                                f"{source.author.mention} - You are in the `{x}{'st' if x == 1 else ('nd' if x == 2 else 'th')}` place {add}! Keep it up! - **Prestige:** {df_users['prestige'][df_user] if not isnan(df_users['prestige'][df_user]) else 0} - **Level:** {df_users['level'][df_user]} - **XP:** {df_users['xp'][df_user]}"
-                            )
-
-                        break
+            x = ranking.rank(source.author.id)
 
-                    x += 1
+            if x is None:
+                content = f"{source.author.mention} - You aren't ranked yet, send some messages to gain xp!"
+
+                if isinstance(source, Context):
+                    return await source.send(content)
+                else:
+                    return await source.response.send_message(content)
+
+            if mods or self.bot.utils_class.is_mod(source.author, self.bot):
+                add = "of the server *(including moderators)*"
+            else:
+                # Only the moderators ranked above the author are skipped
+                rank = x
+                x -= sum(
+                    1
+                    for member in self.get_moderators(source.guild)
+                    if (ranking.rank(member.id) or rank) < rank
+                )
+
+            prestige, level, xp = ranking.score(source.author.id)
+            content = f"{source.author.mention} - You are in the `{x}{'st' if x == 1 else ('nd' if x == 2 else 'th')}` place {add}! Keep it up! - **Prestige:** {prestige} - **Level:** {level} - **XP:** {xp}"
+
+            if isinstance(source, Context):
+                await source.send(content)
+            else:
+                await source.response.send_message(content)
         else:
             if mods:
                 add = "of the server *(including moderators)*"
@@ -681,21 +681,128 @@ class Miscellaneous(Cog, name="misc.xp"):
                 em.set_footer(text=self.bot.user.name)
 
             x = 1
-            for df_user in df_users.index.values:
+            for user_id, name, prestige, level, xp in ranking:
+                if x > 10:
+                    break
+
+                try:
+                    member = source.guild.get_member(
+                        user_id
+                    ) or await source.guild.fetch_member(user_id)
+                except NotFound:
+                    continue
+
+                if mods or not self.bot.utils_class.is_mod(member, self.bot):
+                    em.add_field(
+                        name=f"{x} - {name}",
+                        value=f"**Prestige:** {prestige}\n**Level:** {level}\n**XP:** {xp}",
+                        inline=True,
+                    )
+
+                    x += 1
+
+            if isinstance(source, Context):
+                await source.send(embed=em)
+            else:
+                await source.response.send_message(embed=em)
+
+    def get_moderators(self, guild: Guild) -> list:
+        """Returns the members who are moderators of the guild, from the moderators, the moderator roles and the administrator roles"""
+        candidates = {guild.owner_id: guild.get_member(guild.owner_id)}
+        config = self.bot.runtime_configs[guild.id]
+
+        for _id in config.moderators:
+            role = guild.get_role(_id)
+
+            if role is None:
+                candidates[_id] = guild.get_member(_id)
+            else:
+                candidates.update((member.id, member) for member in role.members)
+
+        for role in guild.roles:
+            if role.permissions.administrator:
+                candidates.update((member.id, member) for member in role.members)
+
+        return [
+            member
+            for member in candidates.values()
+            if member is not None and self.bot.utils_class.is_mod(member, self.bot)
+        ]
+
+    async def handle_period_leaderboard(
+        self,
+        source: Union[Context, GuildCommandInteraction],
+        me: bool,
+        mods: bool,
+        period: str,
+    ):
+        """Displays the top 10 members of the server or the rank of the author by xp gained during the period"""
+        await self.bot.user_repo.aio.load_xp(source.guild.id)
+        rows = self.bot.user_repo.xp.window_ranking(source.guild.id, PERIODS[period])
+        add = (
+            f"of the {period} *({'including' if mods else 'not including'} moderators)*"
+        )
+
+        if me:
+            if not mods and self.bot.utils_class.is_mod(source.author, self.bot):
+                add = f"of the {period} *(including moderators)*"
+                mods = True
+
+            x = 1
+            for user_id, xp in rows:
+                if user_id == source.author.id:
+                    content = f"{source.author.mention} - You are in the `{x}{'st' if x == 1 else ('nd' if x == 2 else 'th')}` place {add}! Keep it up! - **XP:** {xp}"
+                    break
+
+                member = source.guild.get_member(user_id)
+
+                if (
+                    mods
+                    or not member
+                    or not self.bot.utils_class.is_mod(member, self.bot)
+                ):
+                    x += 1
+            else:
+                content = f"{source.author.mention} - You haven't gained any xp during the last {PERIODS[period]} days!"
+
+            if isinstance(source, Context):
+                await source.send(content)
+            else:
+                await source.response.send_message(content)
+        else:
+            em = Embed(colour=self.bot.color, title=f"Ranking {add}!")
+
+            if source.guild.icon:
+                em.set_thumbnail(url=source.guild.icon.url)
+                em.set_author(name=source.guild.name, icon_url=source.guild.icon.url)
+            else:
+                em.set_author(
+                    name=source.guild.name,
+                )
+
+            if self.bot.user.avatar:
+                em.set_footer(
+                    text=self.bot.user.name, icon_url=self.bot.user.avatar.url
+                )
+            else:
+                em.set_footer(text=self.bot.user.name)
+
+            x = 1
+            for user_id, xp in rows:
                 if x > 10:
                     break
 
                 try:
                     member = source.guild.get_member(
-                        int(df_user)
-                    ) or await source.guild.fetch_member(int(df_user))
+                        user_id
+                    ) or await source.guild.fetch_member(user_id)
                 except NotFound:
                     continue
 
                 if mods or not self.bot.utils_class.is_mod(member, self.bot):
                     em.add_field(
-                        name=f"{x} - {df_users['name'][df_user]}",
-                        value=f"**Prestige:** {df_users['prestige'][df_user] if not isnan(df_users['prestige'][df_user]) else 0}\n**Level:** {df_users['level'][df_user]}\n**XP:** {df_users['xp'][df_user]}",
+                        name=f"{x} - {member}",
+                        value=f"**XP:** {xp}",
                         inline=True,
                     )
 
@@ -36,6 +36,17 @@ from disnake.ui import Button, Select, View
 
 from bot import Omnitron
 from data import DurationType, Utils, Xp_class
+from data.cooldowns import XP_COOLDOWN
+from data.Database.xp_jobs import (
+    clamp_levels,
+    decay_xp,
+    purge_prestiges,
+    remove_prestige,
+    reset_season,
+    run_xp_job,
+)
+from data.role_sync import roles_diff
+from data.xp_curve import build_lvl2role_levels, get_curve
 
 BOOL2VAL = {True: "ON", False: "OFF"}
 
@@ -45,6 +56,26 @@ class Moderation(Cog, name="moderation.config"):
         self.bot = bot
         self.xp_class = Xp_class(bot)
 
+    async def cog_after_invoke(self, ctx: Context):
+        """The configuration may have changed, its lookup structures are rebuilt"""
+        self.bot.utils_class.build_runtime_config(ctx.guild.id)
+
+    async def cog_after_slash_command_invoke(self, inter: GuildCommandInteraction):
+        """The configuration may have changed, its lookup structures are rebuilt"""
+        self.bot.utils_class.build_runtime_config(inter.guild.id)
+
+    async def sync_roles(
+        self, source: Union[Context, GuildCommandInteraction], kind: str, plan: dict
+    ):
+        """Starts the roles sync of the members in the background"""
+        job = await self.bot.utils_class.role_sync.start(source.guild, kind, plan)
+
+        if job is not None:
+            await source.channel.send(
+                f"ℹ️ - Updating the roles of `{job.total}` member(s) in the background! Use the command `{self.bot.utils_class.get_guild_pre(source.guild.id)[0]}config roles_sync` to follow it.",
+                delete_after=20,
+            )
+
     """ MAIN GROUP """
 
     @group(
@@ -487,7 +518,7 @@ class Moderation(Cog, name="moderation.config"):
                             )
 
                     self.bot.config_repo.purge_moderators(source.guild.id)
-                    self.bot.moderators[source.guild.id] = {}
+                    self.bot.moderators[source.guild.id] = []
 
                     if isinstance(source, Context):
                         await source.send(
@@ -842,7 +873,7 @@ class Moderation(Cog, name="moderation.config"):
                             )
 
                     self.bot.config_repo.purge_djs(source.guild.id)
-                    self.bot.djs[source.guild.id] = {}
+                    self.bot.djs[source.guild.id] = []
 
                     if isinstance(source, Context):
                         await source.send(
@@ -1085,6 +1116,67 @@ class Moderation(Cog, name="moderation.config"):
                 f.text = f"⚠️ - I don't have the right permissions to add reactions in the channel {source.channel.mention} (message: {msg.jump_url}, reaction: 👀)! Required perms: `{', '.join(['ADD_REACTIONS'])}`"
                 raise
 
+    """ ROLES SYNC """
+
+    @config_group.command(
+        pass_context=True,
+        name="roles_sync",
+        aliases=["roles_syncs", "role_sync"],
+        brief="🔄",
+        description="Displays the progress of the server's roles syncs",
+    )
+    async def config_roles_sync_command(self, ctx: Context):
+        """
+        This command displays the progress of the server's roles syncs
+
+        Parameters
+        ----------
+        ctx: :class:`disnake.ext.commands.Context`
+            The command context
+        """
+        await self.handle_roles_sync(ctx)
+
+    @slash_command(
+        name="roles_sync",
+        description="Displays the progress of the server's roles syncs",
+    )
+    @guild_only()
+    @Utils.check_bot_starting()
+    @Utils.check_moderator()
+    async def config_roles_sync_slash_command(self, inter: GuildCommandInteraction):
+        """
+        This slash command displays the progress of the server's roles syncs
+
+        Parameters
+        ----------
+        inter: :class:`disnake.ext.commands.GuildCommandInteraction`
+            The application command interaction
+        """
+        await self.handle_roles_sync(inter)
+
+    async def handle_roles_sync(self, source: Union[Context, GuildCommandInteraction]):
+        jobs = self.bot.utils_class.role_sync.status(source.guild.id)
+
+        if not jobs:
+            msg = f"ℹ️ - {source.author.mention} - No roles sync is running or has recently finished in this server!"
+        else:
+            msg = "**ℹ️ - Here's the server's roles syncs:**\n\n" + "\n".join(
+                f"`{job.kind}` (started <t:{int(job.started)}:R>): `{job.done}`/`{job.total}` members{f', `{job.failed}` failed' if job.failed else ''} - "
+                + (
+                    "running"
+                    if not job.finished
+                    else "finished"
+                    if job.done == job.total
+                    else "stopped"
+                )
+                for job in jobs
+            )
+
+        if isinstance(source, Context):
+            await source.send(msg)
+        else:
+            await source.response.send_message(msg)
+
     """ TICKETS """
 
     @config_group.command(
@@ -1870,17 +1962,18 @@ class Moderation(Cog, name="moderation.config"):
                                 "selects"
                             ]
 
-                        members = set(source.guild.members)
-                        if source.channel.permissions_for(source.guild.me).manage_roles:
-                            for member in members:
-                                if member.bot or role not in member.roles:
-                                    continue
+                        role = role["role"]
 
-                                try:
-                                    await member.remove_roles(role)
-                                except Forbidden as f:
-                                    f.text = f"⚠️ - I don't have the right permissions to remove this role `@{role.name}` from {member} (maybe the role is above mine)"
-                                    raise
+                        if source.channel.permissions_for(source.guild.me).manage_roles:
+                            await self.sync_roles(
+                                source,
+                                "select2role",
+                                {
+                                    member.id: roles_diff(member, remove=[role.id])
+                                    for member in source.guild.members
+                                    if not member.bot
+                                },
+                            )
                         else:
                             await self.bot.utils_class.send_message_to_mods(
                                 f"⚠️ - I don't have the right permissions to manage this role `@{role.name}` (i tried to remove the old select to role role from members)! Required perms: `{', '.join(['MANAGE_ROLES'])}`",
@@ -1913,11 +2006,13 @@ class Moderation(Cog, name="moderation.config"):
                             )
 
                     self.bot.config_repo.purge_select2role(source.guild.id)
-                    roles = set(
-                        self.bot.configs[source.guild.id]["select2role"][
+                    roles = {
+                        v["role"]
+                        for v in self.bot.configs[source.guild.id]["select2role"][
                             "selects"
                         ].values()
-                    )
+                        if v["role"]
+                    }
                     del self.bot.configs[source.guild.id]["select2role"]["selects"]
 
                     if isinstance(source, Context):
@@ -1929,21 +2024,21 @@ class Moderation(Cog, name="moderation.config"):
                             f"ℹ️ - Removed all the titles from the select to role list."
                         )
 
-                    members = set(source.guild.members)
-
                     if source.channel.permissions_for(source.guild.me).manage_roles:
-                        for member in members:
-                            if member.bot or not roles & set(member.roles):
-                                continue
-
-                            try:
-                                await member.remove_roles(*roles)
-                            except Forbidden as f:
-                                f.text = f"⚠️ - I don't have the right permissions to remove one of these roles {', '.join([f'`@{role.name}`' for role in roles])} from {member} (maybe one of them is above mine)"
-                                raise
+                        await self.sync_roles(
+                            source,
+                            "select2role",
+                            {
+                                member.id: roles_diff(
+                                    member, remove=[role.id for role in roles]
+                                )
+                                for member in source.guild.members
+                                if not member.bot
+                            },
+                        )
                     else:
                         await self.bot.utils_class.send_message_to_mods(
-                            f"⚠️ - I don't have the right permissions to manage this role `@{role.name}` (i tried to remove the old level role from members)! Required perms: `{', '.join(['MANAGE_ROLES'])}`",
+                            f"⚠️ - I don't have the right permissions to manage these roles {', '.join([f'`@{role.name}`' for role in roles])} (i tried to remove the old select to role roles from members)! Required perms: `{', '.join(['MANAGE_ROLES'])}`",
                             source.guild.id,
                         )
                 else:
@@ -2259,32 +2354,23 @@ class Moderation(Cog, name="moderation.config"):
                         )
 
                     if source.channel.permissions_for(source.guild.me).manage_roles:
-                        db_users = self.bot.user_repo.get_users(source.guild.id)
-
-                        for db_user in db_users.values():
-                            if db_user["muted"]:
-                                try:
-                                    member = source.guild.get_member(
-                                        int(db_user["id"])
-                                    ) or await source.guild.fetch_member(
-                                        int(db_user["id"])
-                                    )
-                                except NotFound:
-                                    continue
-
-                                if old_role:
-                                    try:
-                                        if old_role in member.roles:
-                                            await member.remove_roles(old_role)
-                                    except Forbidden as f:
-                                        f.text = f"⚠️ - I don't have the right permissions to remove the role `{old_role}` from {member} (maybe the role is above mine)"
-                                        raise
+                        db_users = await self.bot.user_repo.aio.get_users(
+                            source.guild.id, ["id", "muted"]
+                        )
 
-                                try:
-                                    await member.add_roles(muted)
-                                except Forbidden as f:
-                                    f.text = f"⚠️ - I don't have the right permissions to add the role `{muted}` to {member} (maybe the role is above mine)"
-                                    raise
+                        # The members who left are skipped by the job
+                        await self.sync_roles(
+                            source,
+                            "muted_role",
+                            {
+                                int(db_user["id"]): (
+                                    [muted.id],
+                                    [old_role.id] if old_role else [],
+                                )
+                                for db_user in db_users.values()
+                                if db_user.get("muted")
+                            },
+                        )
                     else:
                         await self.bot.utils_class.send_message_to_mods(
                             f"⚠️ - I don't have the right permissions to manage these roles {f'`@{old_role.name}` ' if old_role else ''}`@{muted.name}` (i tried to replace the old muted role with the new one from muted members)! Required perms: `{', '.join(['MANAGE_ROLES'])}`",
@@ -2313,25 +2399,19 @@ class Moderation(Cog, name="moderation.config"):
                         await source.response.send_message(msg)
 
                     if source.channel.permissions_for(source.guild.me).manage_roles:
-                        db_users = self.bot.user_repo.get_users(source.guild.id)
-
-                        for db_user in db_users.values():
-                            if db_user["muted"]:
-                                try:
-                                    member = source.guild.get_member(
-                                        int(db_user["id"])
-                                    ) or await source.guild.fetch_member(
-                                        int(db_user["id"])
-                                    )
-                                except NotFound:
-                                    continue
+                        db_users = await self.bot.user_repo.aio.get_users(
+                            source.guild.id, ["id", "muted"]
+                        )
 
-                                try:
-                                    if old_role in member.roles:
-                                        await member.remove_roles(*old_role)
-                                except Forbidden as f:
-                                    f.text = f"⚠️ - I don't have the right permissions to remove the role `{old_role}` from {member} (maybe the role is above mine)"
-                                    raise
+                        await self.sync_roles(
+                            source,
+                            "muted_role",
+                            {
+                                int(db_user["id"]): ([], [old_role.id])
+                                for db_user in db_users.values()
+                                if db_user.get("muted")
+                            },
+                        )
                     else:
                         await self.bot.utils_class.send_message_to_mods(
                             f"⚠️ - I don't have the right permissions to manage this role `@{old_role.name}` (i tried to remove the old muted role from muted members)! Required perms: `{', '.join(['MANAGE_ROLES'])}`",
@@ -3435,21 +3515,27 @@ class Moderation(Cog, name="moderation.config"):
                 self.bot.configs[source.guild.id]["xp"]["max_lvl"] = max_lvl
 
                 if isinstance(source, Context):
-                    await source.send(
+                    msg = await source.send(
                         f"ℹ️ - The max level is now `{max_lvl}` in this guild!"
                     )
+                    edit = msg.edit
                 else:
                     await source.response.send_message(
                         f"ℹ️ - The max level is now `{max_lvl}` in this guild!"
                     )
+                    edit = source.edit_original_message
 
-                members = set(source.guild.members)
-                for member in members:
-                    db_user = self.bot.user_repo.get_user(source.guild.id, member.id)
-                    if int(db_user["level"]) > max_lvl:
-                        self.bot.user_repo.set_levels(
-                            source.guild.id, member.id, max_lvl
-                        )
+                async def progress(status: str):
+                    await edit(
+                        content=f"ℹ️ - The max level is now `{max_lvl}` in this guild! {status}"
+                    )
+
+                await run_xp_job(
+                    self.bot.user_repo,
+                    source.guild.id,
+                    clamp_levels(max_lvl),
+                    progress,
+                )
             else:
                 if isinstance(source, Context):
                     await source.send(
@@ -3465,6 +3551,261 @@ class Moderation(Cog, name="moderation.config"):
                 delete_after=20,
             )
 
+    """ COOLDOWN """
+
+    @config_xp_group.command(
+        pass_context=True,
+        name="cooldown",
+        aliases=["cd"],
+        brief="⏳",
+        description="Manages the number of seconds between two xp gains of a member by message",
+        usage="(<number of seconds>)",
+    )
+    async def config_xp_cooldown_command(self, ctx: Context, cooldown: int = None):
+        """
+        This command manages the number of seconds between two xp gains of a member by message
+
+        Parameters
+        ----------
+        ctx: :class:`disnake.ext.commands.Context`
+            The command context
+        cooldown: :class:`int` optional
+            The number of seconds
+        """
+        await self.handle_xp_cooldown(ctx, cooldown)
+
+    @config_xp_slash_group.sub_command(
+        name="cooldown",
+        description="Manages the number of seconds between two xp gains of a member by message",
+    )
+    async def config_xp_cooldown_slash_command(
+        self, inter: GuildCommandInteraction, cooldown: int = None
+    ):
+        """
+        This slash command manages the number of seconds between two xp gains of a member by message
+
+        Parameters
+        ----------
+        inter: :class:`disnake.ext.commands.GuildCommandInteraction`
+            The application command interaction
+        cooldown: :class:`int` optional
+            The number of seconds
+        """
+        await self.handle_xp_cooldown(inter, cooldown)
+
+    async def handle_xp_cooldown(
+        self,
+        source: Union[Context, GuildCommandInteraction],
+        cooldown: int = None,
+    ):
+        if cooldown is None:
+            if isinstance(source, Context):
+                return await source.send(
+                    f"ℹ️ - The current server's xp cooldown is: `{self.bot.configs[source.guild.id]['xp'].get('cooldown', XP_COOLDOWN)}` seconds"
+                )
+            else:
+                return await source.response.send_message(
+                    f"ℹ️ - The current server's xp cooldown is: `{self.bot.configs[source.guild.id]['xp'].get('cooldown', XP_COOLDOWN)}` seconds"
+                )
+        elif cooldown < 0:
+            if isinstance(source, Context):
+                return await source.reply(
+                    f"ℹ️ - {source.author.mention} - The xp cooldown value can't be negative!",
+                    delete_after=20,
+                )
+            else:
+                return await source.response.send_message(
+                    f"ℹ️ - {source.author.mention} - The xp cooldown value can't be negative!",
+                    ephemeral=True,
+                )
+
+        self.bot.config_repo.set_xp_cooldown(source.guild.id, cooldown)
+        self.bot.configs[source.guild.id]["xp"]["cooldown"] = cooldown
+
+        if isinstance(source, Context):
+            await source.send(
+                f"ℹ️ - The xp cooldown is now `{cooldown}` seconds in this guild!"
+            )
+        else:
+            await source.response.send_message(
+                f"ℹ️ - The xp cooldown is now `{cooldown}` seconds in this guild!"
+            )
+
+    """ DECAY """
+
+    @config_xp_group.command(
+        pass_context=True,
+        name="decay",
+        brief="📉",
+        description="Removes a percentage of the xp of every member of the server, levels included",
+        usage="<percentage>",
+    )
+    async def config_xp_decay_command(self, ctx: Context, percentage: int):
+        """
+        This command removes a percentage of the xp of every member of the server, levels included
+
+        Parameters
+        ----------
+        ctx: :class:`disnake.ext.commands.Context`
+            The command context
+        percentage: :class:`int`
+            The percentage of xp to remove
+        """
+        await self.handle_xp_decay(ctx, percentage)
+
+    @config_xp_slash_group.sub_command(
+        name="decay",
+        description="Removes a percentage of the xp of every member of the server, levels included",
+    )
+    async def config_xp_decay_slash_command(
+        self, inter: GuildCommandInteraction, percentage: int
+    ):
+        """
+        This slash command removes a percentage of the xp of every member of the server, levels included
+
+        Parameters
+        ----------
+        inter: :class:`disnake.ext.commands.GuildCommandInteraction`
+            The application command interaction
+        percentage: :class:`int`
+            The percentage of xp to remove
+        """
+        await self.handle_xp_decay(inter, percentage)
+
+    async def handle_xp_decay(
+        self, source: Union[Context, GuildCommandInteraction], percentage: int
+    ):
+        if not 0 < percentage <= 100:
+            if isinstance(source, Context):
+                return await source.reply(
+                    f"ℹ️ - {source.author.mention} - The percentage must be between 1 and 100!",
+                    delete_after=20,
+                )
+            else:
+                return await source.response.send_message(
+                    f"ℹ️ - {source.author.mention} - The percentage must be between 1 and 100!",
+                    ephemeral=True,
+                )
+
+        await self.handle_xp_job(
+            source,
+            f"ℹ️ - Removing `{percentage}%` of the xp of every member of this guild!",
+            decay_xp(
+                get_curve(self.bot.configs[source.guild.id]["xp"]["max_lvl"]),
+                percentage / 100,
+            ),
+        )
+
+    """ SEASON RESET """
+
+    @config_xp_group.command(
+        pass_context=True,
+        name="reset_season",
+        aliases=["new_season", "season"],
+        brief="🔄",
+        description="Brings every member of the server back to the level 1 without xp, and without prestige if asked",
+        usage="(<keep prestiges (yes|no)>)",
+    )
+    async def config_xp_reset_season_command(
+        self, ctx: Context, keep_prestiges: bool = True
+    ):
+        """
+        This command brings every member of the server back to the level 1 without xp, and without prestige if asked
+
+        Parameters
+        ----------
+        ctx: :class:`disnake.ext.commands.Context`
+            The command context
+        keep_prestiges: :class:`bool` optional
+            If the members keep their prestiges
+        """
+        await self.handle_reset_season(ctx, keep_prestiges)
+
+    @config_xp_slash_group.sub_command(
+        name="reset_season",
+        description="Brings every member of the server back to the level 1 without xp, and without prestige if asked",
+    )
+    async def config_xp_reset_season_slash_command(
+        self, inter: GuildCommandInteraction, keep_prestiges: bool = True
+    ):
+        """
+        This slash command brings every member of the server back to the level 1 without xp, and without prestige if asked
+
+        Parameters
+        ----------
+        inter: :class:`disnake.ext.commands.GuildCommandInteraction`
+            The application command interaction
+        keep_prestiges: :class:`bool` optional
+            If the members keep their prestiges
+        """
+        await self.handle_reset_season(inter, keep_prestiges)
+
+    async def handle_reset_season(
+        self, source: Union[Context, GuildCommandInteraction], keep_prestiges: bool
+    ):
+        await self.handle_xp_job(
+            source,
+            f"ℹ️ - Starting a new season, every member of this guild is back to the level 1{'' if keep_prestiges else ' without prestige'}!",
+            reset_season(keep_prestiges),
+            []
+            if keep_prestiges
+            else [
+                role.id
+                for role in self.bot.configs[source.guild.id]["xp"]
+                .get("prestiges", {})
+                .values()
+                if role
+            ],
+        )
+
+    async def handle_xp_job(
+        self,
+        source: Union[Context, GuildCommandInteraction],
+        message: str,
+        transform,
+        removed_role_ids: list = None,
+    ):
+        """Applies the xp job to every member with its progress in the message, then syncs the level roles of the modified members"""
+        if isinstance(source, Context):
+            msg = await source.send(message)
+            edit = msg.edit
+        else:
+            await source.response.send_message(message)
+            edit = source.edit_original_message
+
+        async def progress(status: str):
+            await edit(content=f"{message} {status}")
+
+        changes = await run_xp_job(
+            self.bot.user_repo, source.guild.id, transform, progress
+        )
+
+        removed_role_ids = removed_role_ids or []
+
+        if not changes and not removed_role_ids:
+            return
+
+        if source.channel.permissions_for(source.guild.me).manage_roles:
+            plan = {}
+
+            for member in source.guild.members:
+                if member.bot:
+                    continue
+
+                add, remove = (
+                    self.xp_class.level_roles_diff(member, changes[member.id][1])
+                    if member.id in changes
+                    else ([], [])
+                )
+                plan[member.id] = roles_diff(member, add, removed_role_ids + remove)
+
+            await self.sync_roles(source, "levels", plan)
+        else:
+            await self.bot.utils_class.send_message_to_mods(
+                f"⚠️ - I don't have the right permissions to update the level roles of the members after their xp changed! Required perms: `{', '.join(['MANAGE_ROLES'])}`",
+                source.guild.id,
+            )
+
     """ LEVEL TO ROLE """
 
     @config_xp_group.command(
@@ -3682,6 +4023,7 @@ class Moderation(Cog, name="moderation.config"):
                             self.bot.configs[source.guild.id]["xp"]["lvl2role"] = {}
 
                         self.bot.configs[source.guild.id]["xp"]["lvl2role"][lvl] = role
+                        build_lvl2role_levels(self.bot.configs[source.guild.id]["xp"])
 
                         if isinstance(source, Context):
                             await source.send(
@@ -3692,18 +4034,21 @@ class Moderation(Cog, name="moderation.config"):
                                 f"ℹ️ - {'Added' if option == 'add' else 'Updated'} the level `{lvl}` corresponding to the `@{role}` role {'to' if option == 'add' else 'from'} the level to role list."
                             )
 
-                        db_users = self.bot.user_repo.get_users(source.guild.id)
-                        members = set(source.guild.members)
-
-                        for member in members:
-                            if member.bot:
-                                continue
+                        db_users = await self.bot.user_repo.aio.get_users(
+                            source.guild.id, ["level"]
+                        )
 
-                            await self.xp_class.manage_levels(
-                                member,
-                                db_users[str(member.id)]["level"],
-                                "new_r_2_l",
-                            )
+                        await self.sync_roles(
+                            source,
+                            "level_to_role",
+                            {
+                                member.id: self.xp_class.level_roles_diff(
+                                    member, db_users[str(member.id)]["level"]
+                                )
+                                for member in source.guild.members
+                                if not member.bot and str(member.id) in db_users
+                            },
+                        )
                     elif option == "remove":
                         if "lvl2role" not in self.bot.configs[source.guild.id][
                             "xp"
@@ -3738,18 +4083,18 @@ class Moderation(Cog, name="moderation.config"):
                         if not self.bot.configs[source.guild.id]["xp"]["lvl2role"]:
                             del self.bot.configs[source.guild.id]["xp"]["lvl2role"]
 
-                        if source.channel.permissions_for(source.guild.me).manage_roles:
-                            members = set(source.guild.members)
-
-                            for member in members:
-                                if member.bot or role not in member.roles:
-                                    continue
+                        build_lvl2role_levels(self.bot.configs[source.guild.id]["xp"])
 
-                                try:
-                                    await member.remove_roles(role)
-                                except Forbidden as f:
-                                    f.text = f"⚠️ - I don't have the right permissions to remove this role `@{role.name}` from {member} (maybe the role is above mine)"
-                                    raise
+                        if source.channel.permissions_for(source.guild.me).manage_roles:
+                            await self.sync_roles(
+                                source,
+                                "level_to_role",
+                                {
+                                    member.id: roles_diff(member, remove=[role.id])
+                                    for member in source.guild.members
+                                    if not member.bot
+                                },
+                            )
                         else:
                             await self.bot.utils_class.send_message_to_mods(
                                 f"⚠️ - I don't have the right permissions to manage this role `@{role.name}` (i tried to remove the old level role from members)! Required perms: `{', '.join(['MANAGE_ROLES'])}`",
@@ -3773,6 +4118,7 @@ class Moderation(Cog, name="moderation.config"):
                         self.bot.configs[source.guild.id]["xp"]["lvl2role"].values()
                     )
                     del self.bot.configs[source.guild.id]["xp"]["lvl2role"]
+                    build_lvl2role_levels(self.bot.configs[source.guild.id]["xp"])
 
                     if isinstance(source, Context):
                         await source.send(
@@ -3784,17 +4130,17 @@ class Moderation(Cog, name="moderation.config"):
                         )
 
                     if source.channel.permissions_for(source.guild.me).manage_roles:
-                        members = set(source.guild.members)
-
-                        for member in members:
-                            if member.bot or not roles & set(member.roles):
-                                continue
-
-                            try:
-                                await member.remove_roles(*roles)
-                            except Forbidden as f:
-                                f.text = f"⚠️ - I don't have the right permissions to remove one of these roles {', '.join([f'`@{role.name}`' for role in roles])} from {member} (maybe one of them is above mine)"
-                                raise
+                        await self.sync_roles(
+                            source,
+                            "level_to_role",
+                            {
+                                member.id: roles_diff(
+                                    member, remove=[role.id for role in roles if role]
+                                )
+                                for member in source.guild.members
+                                if not member.bot
+                            },
+                        )
                     else:
                         await self.bot.utils_class.send_message_to_mods(
                             f"⚠️ - I don't have the right permissions to manage these roles {', '.join([f'`@{role.name}`' for role in roles])} (i tried to remove the old level roles from members)! Required perms: `{', '.join(['MANAGE_ROLES'])}`",
@@ -4112,23 +4458,17 @@ class Moderation(Cog, name="moderation.config"):
                         )
 
                     if source.channel.permissions_for(source.guild.me).manage_roles:
-                        members = set(source.guild.members)
-
-                        for member in members:
-                            if member.bot or old_role not in member.roles:
-                                continue
-
-                            try:
-                                await member.remove_roles(old_role)
-                            except Forbidden as f:
-                                f.text = f"⚠️ - I don't have the right permissions to remove the role `{old_role}` from {member} (maybe the role is above mine)"
-                                raise
-
-                            try:
-                                await member.add_roles(role)
-                            except Forbidden as f:
-                                f.text = f"⚠️ - I don't have the right permissions to add the role `{role}` to {member} (maybe the role is above mine)"
-                                raise
+                        await self.sync_roles(
+                            source,
+                            "prestiges",
+                            {
+                                member.id: roles_diff(
+                                    member, add=[role.id], remove=[old_role.id]
+                                )
+                                for member in source.guild.members
+                                if not member.bot and old_role in member.roles
+                            },
+                        )
                     else:
                         await self.bot.utils_class.send_message_to_mods(
                             f"⚠️ - I don't have the right permissions to manage these roles `@{old_role.name}`, `@{role.name}` (i tried to replace the old prestige role with the new one from members)! Required perms: `{', '.join(['MANAGE_ROLES'])}`",
@@ -4163,24 +4503,38 @@ class Moderation(Cog, name="moderation.config"):
                     if not self.bot.configs[source.guild.id]["xp"]["prestiges"]:
                         del self.bot.configs[source.guild.id]["xp"]["prestiges"]
 
+                    removed = await run_xp_job(
+                        self.bot.user_repo,
+                        source.guild.id,
+                        remove_prestige(
+                            get_curve(
+                                self.bot.configs[source.guild.id]["xp"]["max_lvl"]
+                            ),
+                            prestige,
+                        ),
+                    )
+
                     if source.channel.permissions_for(source.guild.me).manage_roles:
-                        members = set(source.guild.members)
+                        plan = {}
 
-                        for member in members:
-                            if member.bot or old_role not in member.roles:
+                        for member in source.guild.members:
+                            if member.bot:
                                 continue
 
-                            try:
-                                await member.remove_roles(old_role)
-                            except Forbidden:
-                                await self.bot.utils_class.send_message_to_mods(
-                                    f"⚠️ - I don't have the right permissions to remove the role `{old_role}` from {member} (maybe the role is above mine)",
-                                    source.guild.id,
+                            add, remove = (
+                                self.xp_class.level_roles_diff(
+                                    member, removed[member.id][1]
                                 )
-
-                            await self.xp_class.manage_prestige(
-                                member, "removed_prestige"
+                                if member.id in removed
+                                else ([], [])
+                            )
+                            plan[member.id] = roles_diff(
+                                member,
+                                add,
+                                ([old_role.id] if old_role else []) + remove,
                             )
+
+                        await self.sync_roles(source, "prestiges", plan)
                     else:
                         await self.bot.utils_class.send_message_to_mods(
                             f"⚠️ - I don't have the right permissions to manage this role `@{old_role.name}` (i tried to remove the old prestige role from members)! Required perms: `{', '.join(['MANAGE_ROLES'])}`",
@@ -4206,32 +4560,52 @@ class Moderation(Cog, name="moderation.config"):
                     del self.bot.configs[source.guild.id]["xp"]["prestiges"]
 
                     if isinstance(source, Context):
-                        await source.send(
+                        msg = await source.send(
                             f"ℹ️ - Removed all the prestiges from the prestiges list."
                         )
+                        edit = msg.edit
                     else:
                         await source.response.send_message(
                             f"ℹ️ - Removed all the prestiges from the prestiges list."
                         )
+                        edit = source.edit_original_message
+
+                    async def progress(status: str):
+                        await edit(
+                            content=f"ℹ️ - Removed all the prestiges from the prestiges list. {status}"
+                        )
+
+                    purged = await run_xp_job(
+                        self.bot.user_repo,
+                        source.guild.id,
+                        purge_prestiges(
+                            get_curve(
+                                self.bot.configs[source.guild.id]["xp"]["max_lvl"]
+                            )
+                        ),
+                        progress,
+                    )
 
                     if source.channel.permissions_for(source.guild.me).manage_roles:
-                        members = set(source.guild.members)
+                        old_role_ids = [role.id for role in old_roles if role]
+                        plan = {}
 
-                        for member in members:
-                            if member.bot or not set(member.roles) & set(old_roles):
+                        for member in source.guild.members:
+                            if member.bot:
                                 continue
 
-                            try:
-                                await member.remove_roles(*old_roles)
-                            except Forbidden:
-                                await self.bot.utils_class.send_message_to_mods(
-                                    f"⚠️ - I don't have the right permissions to remove one of these roles {', '.join([f'`@{role.name}`' for role in old_roles])} from {member} (maybe one of these roles is above mine)",
-                                    source.guild.id,
+                            add, remove = (
+                                self.xp_class.level_roles_diff(
+                                    member, purged[member.id][1]
                                 )
-
-                            await self.xp_class.manage_prestige(
-                                member, "purged_prestiges"
+                                if member.id in purged
+                                else ([], [])
                             )
+                            plan[member.id] = roles_diff(
+                                member, add, old_role_ids + remove
+                            )
+
+                        await self.sync_roles(source, "prestiges", plan)
                     else:
                         await self.bot.utils_class.send_message_to_mods(
                             f"⚠️ - I don't have the right permissions to manage these roles {', '.join([f'`@{role.name}`' for role in old_roles])} (i tried to remove the prestige level roles from members)! Required perms: `{', '.join(['MANAGE_ROLES'])}`",
@@ -184,7 +184,10 @@ class Moderation(Cog, name="moderation.stats"):
                     f"ℹ️ - {f'The member `{member}`' if member != source.author else 'You'} {f'have sent a total of `{count}`' if count else 'have never sent any'} message{'s' if count > 1 else ''} {f'in the channel {text_channel.mention}' if text_channel else 'in the server'}!"
                 )
         else:
-            db_users = self.bot.user_repo.get_users(source.guild.id)
+            await self.bot.user_repo.counters.aflush()
+            db_users = await self.bot.user_repo.aio.get_users(
+                source.guild.id, ["messages_count"]
+            )
 
             if not isinstance(source, Context):
                 await source.response.defer()
@@ -331,7 +334,10 @@ class Moderation(Cog, name="moderation.stats"):
                     f"ℹ️ - {f'The member `{member}`' if member != source.author else 'You'} {f'have been connected a total of `{self.bot.utils_class.duration(count)}`' if count else 'have never been connected' + (' to any voice channels' if not voice_channel else '')} {f'in the channel {voice_channel.mention}' if voice_channel else 'in the server'}!"
                 )
         else:
-            db_users = self.bot.user_repo.get_users(source.guild.id)
+            await self.bot.user_repo.counters.aflush()
+            db_users = await self.bot.user_repo.aio.get_users(
+                source.guild.id, ["voice_count"]
+            )
 
             if not isinstance(source, Context):
                 await source.response.defer()
@@ -0,0 +1,3 @@
+from .base import Backend
+from .memory import MemoryBackend
+from .sqlite import SqliteBackend
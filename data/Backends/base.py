@@ -0,0 +1,154 @@
+from collections import OrderedDict
+from random import choice
+from threading import RLock
+from time import time
+
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+
+def split_path(path: str) -> list:
+    return [key for key in str(path).split("/") if key]
+
+
+def push_key() -> str:
+    """Generates a chronologically ordered unique key like the firebase push ids"""
+    now = int(time() * 1000)
+    key = ""
+
+    for _ in range(8):
+        key = PUSH_CHARS[now % 64] + key
+        now //= 64
+
+    return key + "".join(choice(PUSH_CHARS) for _ in range(12))
+
+
+def resolve(value, current=None):
+    """Returns the value the way the database stores it (string keys, no empty nodes and server values applied)"""
+    if isinstance(value, (list, tuple)):
+        value = {str(i): v for i, v in enumerate(value)}
+
+    if isinstance(value, dict):
+        if ".sv" in value:
+            server_value = value[".sv"]
+
+            if server_value == "timestamp":
+                return int(time() * 1000)
+            elif isinstance(server_value, dict) and "increment" in server_value:
+                return (
+                    current if isinstance(current, (int, float)) else 0
+                ) + server_value["increment"]
+
+        current = current if isinstance(current, dict) else {}
+        node = {}
+
+        for key, child in value.items():
+            child = resolve(child, current.get(str(key)))
+
+            if child is not None:
+                node[str(key)] = child
+
+        return node or None
+
+    return value
+
+
+def export(node):
+    """Returns the stored node the way firebase returns it, integer keyed nodes being converted to lists"""
+    if not isinstance(node, dict):
+        return node
+
+    if node and all(key.isdigit() for key in node):
+        indexes = [int(key) for key in node]
+
+        # Firebase returns an array when more than half of the indexes are used
+        if max(indexes) < 2 * len(indexes):
+            array = [None] * (max(indexes) + 1)
+
+            for key, child in node.items():
+                array[int(key)] = export(child)
+
+            return array
+
+    return OrderedDict(
+        (key, export(node[key]))
+        for key in sorted(
+            node, key=lambda k: (0, int(k), "") if k.isdigit() else (1, 0, k)
+        )
+    )
+
+
+class Backend:
+    """Storage of the JSON tree, paths and values follow the firebase realtime database semantics"""
+
+    def __init__(self) -> None:
+        self.lock = RLock()
+
+    def read(self, keys: list):
+        """Returns the node stored at the keys or None"""
+        raise NotImplementedError
+
+    def write(self, keys: list, value) -> None:
+        """Replaces the node stored at the keys, removes it if the value is None"""
+        raise NotImplementedError
+
+    def read_keys(self, keys: list):
+        """Returns the keys of the children of the node stored at the keys (shallow read)"""
+        node = self.read(keys)
+        return {key: True for key in node} if isinstance(node, dict) else node
+
+    def read_fields(self, keys: list, fields: list):
+        """Returns the children of the node stored at the keys with only the given fields"""
+        node = self.read(keys)
+
+        if not isinstance(node, dict):
+            return node
+
+        return {
+            key: {field: child[field] for field in fields if field in child}
+            for key, child in node.items()
+            if isinstance(child, dict) and any(field in child for field in fields)
+        } or None
+
+    def create(self, path: str, event: str = "set", args=None) -> None:
+        keys = split_path(path)
+
+        with self.lock:
+            if event == "push":
+                keys.append(push_key())
+
+            self.write(keys, resolve(args, self.read(keys)))
+
+    def update(self, path: str, args: dict) -> None:
+        keys = split_path(path)
+
+        with self.lock:
+            for key, value in args.items():
+                child = keys + split_path(key)
+                self.write(child, resolve(value, self.read(child)))
+
+    def delete(self, path: str) -> None:
+        with self.lock:
+            self.write(split_path(path), None)
+
+    def transaction(self, path: str, function):
+        """Replaces the node with the result of the function applied to it atomically and returns the new value"""
+        keys = split_path(path)
+
+        with self.lock:
+            value = function(export(self.read(keys)))
+            self.write(keys, resolve(value))
+            return value
+
+    def get(self, path: str, shallow: bool = False, fields: list = None):
+        with self.lock:
+            if shallow:
+                node = self.read_keys(split_path(path))
+                return (
+                    OrderedDict(sorted(node.items()))
+                    if isinstance(node, dict)
+                    else node
+                )
+            elif fields:
+                return export(self.read_fields(split_path(path), fields))
+
+            return export(self.read(split_path(path)))
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from os import getenv
+
+from firebase_admin import credentials, db, initialize_app
+
+from data.Backends.base import Backend
+from data.constants import FIREBASE_DATABASEURL
+
+
+class FirebaseBackend(Backend):
+    """Firebase realtime database, the credentials come from the environment variables"""
+
+    def __init__(self, root: str = "/") -> None:
+        super().__init__()
+        cred = credentials.Certificate(
+            {
+                "type": getenv("type"),
+                "project_id": getenv("project_id"),
+                "private_key_id": getenv("private_key_id"),
+                "private_key": getenv("private_key"),
+                "client_email": getenv("client_email"),
+                "client_id": getenv("client_id"),
+                "auth_uri": getenv("auth_uri"),
+                "token_uri": getenv("token_uri"),
+                "auth_provider_x509_cert_url": getenv("auth_provider_x509_cert_url"),
+                "client_x509_cert_url": getenv("client_x509_cert_url"),
+            }
+        )
+        initialize_app(
+            cred,
+            {"databaseURL": FIREBASE_DATABASEURL or getenv("FIREBASE_DATABASEURL")},
+        )
+
+        # Get a reference to the database service
+        self.ref = db.reference(root)
+
+    def child(self, path: str):
+        return self.ref.child(path) if path else self.ref
+
+    def create(self, path: str, event: str = "set", args=None) -> None:
+        if event == "push":
+            self.child(path).push(args)
+        elif event == "set":
+            self.child(path).set(args)
+
+    def update(self, path: str, args: dict) -> None:
+        return self.child(path).update(args)
+
+    def delete(self, path: str) -> None:
+        return self.child(path).delete()
+
+    def transaction(self, path: str, function):
+        return self.child(path).transaction(function)
+
+    def get(self, path: str, shallow: bool = False, fields: list = None):
+        if shallow:
+            return self.child(path).get(shallow=True) or OrderedDict()
+
+        node = self.child(path).get() or OrderedDict()
+
+        if not fields or not isinstance(node, dict):
+            return node
+
+        # The realtime database can't project fields, they are filtered once received
+        return OrderedDict(
+            (key, {field: child[field] for field in fields if field in child})
+            for key, child in node.items()
+            if isinstance(child, dict) and any(field in child for field in fields)
+        )
@@ -0,0 +1,61 @@
+from copy import deepcopy
+
+from data.Backends.base import Backend
+
+
+class MemoryBackend(Backend):
+    """Keeps the JSON tree in memory, nothing is persisted"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.tree = None
+
+    def read(self, keys: list):
+        node = self.tree
+
+        for key in keys:
+            if not isinstance(node, dict) or key not in node:
+                return None
+
+            node = node[key]
+
+        return deepcopy(node)
+
+    def write(self, keys: list, value) -> None:
+        if not keys:
+            self.tree = value
+            return
+
+        if not isinstance(self.tree, dict):
+            if value is None:
+                return
+
+            self.tree = {}
+
+        parents = [self.tree]
+
+        for key in keys[:-1]:
+            node = parents[-1].get(key)
+
+            if not isinstance(node, dict):
+                if value is None:
+                    return
+
+                node = parents[-1][key] = {}
+
+            parents.append(node)
+
+        if value is None:
+            parents[-1].pop(keys[-1], None)
+
+            # Remove the nodes left empty like firebase does
+            for depth in range(len(parents) - 1, 0, -1):
+                if parents[depth]:
+                    break
+
+                del parents[depth - 1][keys[depth - 1]]
+
+            if not self.tree:
+                self.tree = None
+        else:
+            parents[-1][keys[-1]] = value
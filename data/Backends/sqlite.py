@@ -0,0 +1,122 @@
+from json import dumps, loads
+from sqlite3 import connect
+
+from data.Backends.base import Backend
+
+
+class SqliteBackend(Backend):
+    """Stores the JSON tree in a SQLite database, one row per leaf keyed by its path"""
+
+    def __init__(self, database: str) -> None:
+        super().__init__()
+        self.connection = connect(database, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS nodes (path TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def subtree(path: str) -> tuple:
+        """Returns the where clause matching every leaf under the path ('/' < '0' so the range holds only the children)"""
+        if not path:
+            return "1", ()
+
+        return "(path = ? OR (path >= ? AND path < ?))", (path, f"{path}/", f"{path}0")
+
+    def read(self, keys: list):
+        path = "/".join(keys)
+        clause, params = self.subtree(path)
+        rows = self.connection.execute(
+            f"SELECT path, value FROM nodes WHERE {clause}", params
+        ).fetchall()
+
+        if not rows:
+            return None
+
+        tree = {}
+
+        for leaf, value in rows:
+            if leaf == path:
+                return loads(value)
+
+            node = tree
+            leaf_keys = leaf[len(path) :].strip("/").split("/")
+
+            for key in leaf_keys[:-1]:
+                node = node.setdefault(key, {})
+
+            node[leaf_keys[-1]] = loads(value)
+
+        return tree
+
+    def read_keys(self, keys: list):
+        path = "/".join(keys)
+        clause, params = self.subtree(path)
+        rows = self.connection.execute(
+            f"SELECT path FROM nodes WHERE {clause}", params
+        ).fetchall()
+
+        if not rows:
+            return None
+        elif rows[0][0] == path:
+            return self.read(keys)
+
+        return {leaf[len(path) :].strip("/").split("/")[0]: True for leaf, in rows}
+
+    def read_fields(self, keys: list, fields: list):
+        path = "/".join(keys)
+        prefix = f"{path}/" if path else ""
+        tree = {}
+
+        # Only the leaves of the fields are read instead of the whole children
+        for field in fields:
+            rows = self.connection.execute(
+                "SELECT path, value FROM nodes WHERE path GLOB ? OR path GLOB ?",
+                (f"{prefix}*/{field}", f"{prefix}*/{field}/*"),
+            ).fetchall()
+
+            for leaf, value in rows:
+                leaf_keys = leaf[len(prefix) :].split("/")
+
+                if leaf_keys[1] != field:
+                    continue
+
+                node = tree.setdefault(leaf_keys[0], {})
+
+                for key in leaf_keys[1:-1]:
+                    node = node.setdefault(key, {})
+
+                node[leaf_keys[-1]] = loads(value)
+
+        return tree or None
+
+    def write(self, keys: list, value) -> None:
+        path = "/".join(keys)
+        clause, params = self.subtree(path)
+
+        with self.connection:
+            self.connection.execute(f"DELETE FROM nodes WHERE {clause}", params)
+
+            # A leaf stored on a parent path is replaced by the new node
+            self.connection.executemany(
+                "DELETE FROM nodes WHERE path = ?",
+                [("/".join(keys[:depth]),) for depth in range(1, len(keys))],
+            )
+
+            if value is not None:
+                self.connection.executemany(
+                    "INSERT INTO nodes (path, value) VALUES (?, ?)",
+                    self.flatten(path, value),
+                )
+
+    @classmethod
+    def flatten(cls, path: str, value) -> list:
+        if not isinstance(value, dict):
+            return [(path, dumps(value))]
+
+        return [
+            row
+            for key, child in value.items()
+            for row in cls.flatten(f"{path}/{key}" if path else key, child)
+        ]
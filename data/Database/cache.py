@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from copy import deepcopy
+from os import getenv
+from threading import RLock
+from time import monotonic
+from typing import Optional
+
+
+class UserCache:
+    """Per-guild LRU cache of the user records, every entry expires after a time to live"""
+
+    def __init__(self) -> None:
+        self.max_size = int(getenv("USER_CACHE_SIZE", 5000))
+        self.ttl = float(getenv("USER_CACHE_TTL", 600))
+        self.guilds = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = RLock()
+
+    def get(self, guild_id: int, user_id: int) -> Optional[OrderedDict]:
+        """Returns a copy of the cached record of the user or None if it isn't cached"""
+        with self.lock:
+            users = self.guilds.get(guild_id)
+            entry = users.get(str(user_id)) if users else None
+
+            if entry is None or entry[0] < monotonic():
+                if entry is not None:
+                    del users[str(user_id)]
+
+                self.misses += 1
+                return None
+
+            users.move_to_end(str(user_id))
+            self.hits += 1
+            return deepcopy(entry[1])
+
+    def set(self, guild_id: int, user_id: int, record: dict) -> None:
+        with self.lock:
+            users = self.guilds.setdefault(guild_id, OrderedDict())
+            users[str(user_id)] = (monotonic() + self.ttl, deepcopy(record))
+            users.move_to_end(str(user_id))
+
+            while len(users) > self.max_size:
+                users.popitem(last=False)
+
+    def update(self, guild_id: int, user_id: int, fields: dict) -> None:
+        """Updates the fields of the cached record of the user if it is cached"""
+        with self.lock:
+            entry = self.guilds.get(guild_id, {}).get(str(user_id))
+
+            if entry is not None:
+                entry[1].update(deepcopy(fields))
+
+    def add(self, guild_id: int, user_id: int, field: str, value: int) -> None:
+        """Adds the value to the field of the cached record of the user if it is cached"""
+        with self.lock:
+            entry = self.guilds.get(guild_id, {}).get(str(user_id))
+
+            if entry is not None:
+                entry[1][field] = entry[1].get(field, 0) + value
+
+    def increment(
+        self, guild_id: int, user_id: int, field: str, key: str, value: int = 1
+    ) -> None:
+        """Increments the counter stored under the key of the field of the cached record of the user if it is cached"""
+        with self.lock:
+            entry = self.guilds.get(guild_id, {}).get(str(user_id))
+
+            if entry is not None:
+                counts = entry[1].setdefault(field, {})
+                counts[str(key)] = counts.get(str(key), 0) + value
+
+    def invalidate(self, guild_id: int, user_id: int = None) -> None:
+        """Removes the user from the cache, or the whole guild if no user is given"""
+        with self.lock:
+            if user_id is None:
+                self.guilds.pop(guild_id, None)
+            elif guild_id in self.guilds:
+                self.guilds[guild_id].pop(str(user_id), None)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -2,12 +2,11 @@ from collections import OrderedDict
 from typing import Union
 
 from data import Utils
+from data.Database.repository import Repository
 
 
-class Config:
-    def __init__(self, model) -> None:
-        self.model = model
-        self.innerpath = "config"
+class Config(Repository):
+    innerpath = "config"
 
     """ GUILD MODERATORS """
 
@@ -152,6 +151,10 @@ class Config:
     def set_xp_max_lvl(self, guild_id: int, val: int) -> None:
         self.model.update(f"{self.path}/xp", args={"max_lvl": val})
 
+    @Utils.resolve_guild_path
+    def set_xp_cooldown(self, guild_id: int, val: int) -> None:
+        self.model.update(f"{self.path}/xp", args={"cooldown": val})
+
     @Utils.resolve_guild_path
     def set_xp_notify_channel(self, guild_id: int, channel_id: int) -> None:
         self.model.update(f"{self.path}/xp", args={"notify_channel": channel_id})
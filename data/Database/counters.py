@@ -0,0 +1,47 @@
+from collections import defaultdict
+from os import getenv
+from threading import Lock
+from typing import Optional
+
+from data.Database.flusher import Pending, PeriodicFlusher
+
+
+class CounterBuffer(PeriodicFlusher):
+    """In-memory aggregation of the users counters, written back periodically as a single multi-path update"""
+
+    name = "counters"
+
+    def __init__(self, model) -> None:
+        super().__init__(model, float(getenv("COUNTERS_FLUSH_INTERVAL", 30)))
+        self.max_size = int(getenv("COUNTERS_FLUSH_SIZE", 1000))
+        self.counts = defaultdict(int)
+        self.lock = Lock()
+
+    def add(self, path: str, value: int = 1) -> None:
+        """Adds the value to the counter stored at the given path"""
+        with self.lock:
+            self.counts[path] += value
+            full = len(self.counts) >= self.max_size
+
+        if full:
+            self.flush()
+
+    def collect(self) -> Optional[Pending]:
+        """Takes every pending counter increment"""
+        with self.lock:
+            counts, self.counts = self.counts, defaultdict(int)
+
+        if not counts:
+            return None
+
+        def rollback():
+            # Put the increments back so they're written with the next flush
+            with self.lock:
+                for path, value in counts.items():
+                    self.counts[path] += value
+
+        return (
+            "",
+            {path: self.model.increment(value) for path, value in counts.items()},
+            rollback,
+        )
@@ -0,0 +1,54 @@
+from logging import error
+from typing import Callable, Optional, Tuple
+
+from data import Utils
+
+# The path and the multi-path update to write, and the function putting the changes back if the write fails
+Pending = Tuple[str, dict, Callable[[], None]]
+
+
+class PeriodicFlusher:
+    """Base of the in-memory states written back in a single update periodically and when stopped, the subclasses collect their pending changes"""
+
+    # Named in the error logs
+    name = "state"
+
+    def __init__(self, model, interval: float) -> None:
+        self.model = model
+        self.interval = interval
+        self.task = None
+
+    def collect(self, *args, **kwargs) -> Optional[Pending]:
+        """Takes the pending changes, returns None if there are none"""
+        raise NotImplementedError
+
+    def flush(self, *args, **kwargs) -> None:
+        """Writes the pending changes in a single update, they are put back to be written with the next flush if it fails"""
+        pending = self.collect(*args, **kwargs)
+
+        if pending is None:
+            return
+
+        path, updates, rollback = pending
+
+        try:
+            self.model.update(path, args=updates)
+        except Exception as e:
+            rollback()
+            error(f"Couldn't flush the {self.name}: {type(e).__name__}: {e}")
+
+    async def aflush(self) -> None:
+        await self.model.run(self.flush)
+
+    def start(self) -> None:
+        """Starts the periodic flush if it isn't already running"""
+        if self.task is None:
+            self.task = Utils.task_launcher(self.aflush, (), seconds=self.interval)
+
+    def stop(self) -> None:
+        """Stops the periodic flush and writes the pending changes"""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+        self.flush()
@@ -2,12 +2,11 @@ from collections import OrderedDict
 from typing import Optional
 
 from data import Utils
+from data.Database.repository import Repository
 
 
-class Main:
-    def __init__(self, model) -> None:
-        self.model = model
-        self.innerpath = ""
+class Main(Repository):
+    innerpath = ""
 
     """ CREATE & DELETE """
 
@@ -34,9 +33,33 @@ class Main:
     def get_guild(self, guild_id: int) -> Optional[OrderedDict]:
         return self.model.get(self.path) or None
 
+    @Utils.resolve_guild_path
+    def get_guild_state(self, guild_id: int, reload: bool = False) -> OrderedDict:
+        """Returns the nodes of the guild read by its initialization, only its config when it is reloaded after an eviction"""
+        state = OrderedDict(config=self.model.get(f"{self.path}config"))
+
+        if not reload:
+            state["users"] = self.model.get(
+                f"{self.path}users", fields=["id", "muted", "mutes", "ban"]
+            )
+            state["polls"] = self.model.get(f"{self.path}polls")
+            state["tickets"] = self.model.get(f"{self.path}tickets", shallow=True)
+
+        return state
+
     def get_guilds(self) -> OrderedDict:
         return self.model.get("guilds/")
 
+    def get_guild_ids(self) -> list:
+        return [int(key) for key in self.model.get("guilds/", shallow=True)]
+
+    def set_guilds_present(self, guild_ids: list, present: bool = True) -> None:
+        """Sets the presence of the guilds in a single update"""
+        if guild_ids:
+            self.model.update(
+                "guilds", args={f"{_id}/present": present for _id in guild_ids}
+            )
+
     @Utils.resolve_guild_path
     def update_guild(self, guild_id: int, updates: dict) -> None:
         self.model.update(self.path, args=updates)
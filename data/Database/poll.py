@@ -5,12 +5,11 @@ from typing import Union
 from disnake.ui import View
 
 from data import Utils
+from data.Database.repository import Repository
 
 
-class Poll:
-    def __init__(self, model) -> None:
-        self.model = model
-        self.innerpath = "polls"
+class Poll(Repository):
+    innerpath = "polls"
 
     """ CREATION & DELETION """
 
@@ -82,11 +81,13 @@ class Poll:
     def create_response(
         self, guild_id: int, _id: int, label: str, user_id: int
     ) -> None:
-        current_value = (self.model.get(f"{self.path}/{_id}/choices"))[label]
-        self.model.create(
-            f"{self.path}/{_id}/responses/{user_id}", args={"response": label}
+        self.model.update(
+            f"{self.path}/{_id}",
+            args={
+                f"responses/{user_id}": {"response": label},
+                f"choices/{label}": self.model.increment(1),
+            },
         )
-        self.model.update(f"{self.path}/{_id}/choices", args={label: current_value + 1})
 
     @Utils.resolve_guild_path
     def get_responses(self, guild_id: int, _id: int) -> OrderedDict:
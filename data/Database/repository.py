@@ -0,0 +1,33 @@
+from data.utils import guild_id_context
+
+
+class AsyncRepository:
+    """Awaitable view of a repository, every call is run in the database executor"""
+
+    def __init__(self, repository) -> None:
+        self._repository = repository
+
+    def __getattr__(self, name: str):
+        function = getattr(self._repository, name)
+
+        async def run(*args, **kwargs):
+            return await self._repository.model.run(function, *args, **kwargs)
+
+        return run
+
+
+class Repository:
+    innerpath = ""
+
+    def __init__(self, model) -> None:
+        self.model = model
+        self.aio = AsyncRepository(self)
+
+    def batch(self):
+        """Groups the writes made while the batch is open in a single database update"""
+        return self.model.batch()
+
+    @property
+    def path(self) -> str:
+        """The path of the repository for the guild the current call works on"""
+        return f"guilds/{guild_id_context.get()}/{self.innerpath}"
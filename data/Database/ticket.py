@@ -1,12 +1,11 @@
 from collections import OrderedDict
 
 from data import Utils
+from data.Database.repository import Repository
 
 
-class Ticket:
-    def __init__(self, model) -> None:
-        self.model = model
-        self.innerpath = "tickets"
+class Ticket(Repository):
+    innerpath = "tickets"
 
     """ CREATION & DELETION """
 
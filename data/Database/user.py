@@ -1,15 +1,28 @@
 from collections import OrderedDict
 from datetime import datetime
 from math import ceil
+from typing import Optional
 
 from data import Utils
+from data.Database.cache import UserCache
+from data.Database.counters import CounterBuffer
+from data.Database.repository import Repository
+from data.Database.voice import VoiceSessions
+from data.Database.xp_engine import XpEngine
+from data.ranking import XpRanking
 
 
-class User:
+class User(Repository):
+    innerpath = "users"
+
     def __init__(self, model, bot) -> None:
-        self.model = model
-        self.innerpath = "users"
+        super().__init__(model)
         self.bot = bot
+        self.counters = CounterBuffer(model)
+        self.cache = UserCache()
+        self.rankings = {}
+        self.xp = XpEngine(model, self.innerpath)
+        self.voice = VoiceSessions(self)
 
     """ CHECKS """
 
@@ -21,7 +34,7 @@ class User:
         """
 
         def check(self, guild_id: int, user_id: int, *args, **kargs):
-            if not self.model.get(f"{self.path}/{user_id}"):
+            if not self.__get_record(guild_id, user_id):
                 self.create_user(
                     guild_id,
                     user_id,
@@ -95,21 +108,133 @@ class User:
 
         return check
 
+    """ CACHE """
+
+    def __get_record(self, guild_id: int, _id: int) -> OrderedDict:
+        """Returns the record of the user from the cache or fetch it from the database"""
+        record = self.cache.get(guild_id, _id)
+
+        if record is None:
+            record = self.model.get(f"{self.path}/{_id}")
+
+            if record:
+                self.cache.set(guild_id, _id, record)
+
+        return record
+
+    """ RANKING """
+
+    @Utils.resolve_guild_path
+    def get_ranking(self, guild_id: int) -> XpRanking:
+        """Returns the xp ranking of the guild, it is built on its first use and then kept up to date by the xp writes"""
+        if guild_id not in self.rankings:
+            # The xp engine holds the latest values, they're written before the ranking is built
+            self.xp.flush(guild_id)
+            ranking = XpRanking(
+                self.model.get(
+                    f"{self.path}", fields=["name", "prestige", "level", "xp"]
+                )
+                or {}
+            )
+
+            with self.xp.lock:
+                # The xp awarded during the read
+                for _id, prestige, level, xp in self.xp.pending(guild_id):
+                    ranking.set(_id, prestige=prestige, level=level, xp=xp)
+
+                self.rankings[guild_id] = ranking
+
+        return self.rankings[guild_id]
+
+    def __xp_changed(
+        self, guild_id: int, _id: int, add: bool = False, **values
+    ) -> None:
+        """Applies a write of the xp, level or prestige of the user to the ranking and to the xp engine"""
+        ranking = self.rankings.get(guild_id)
+
+        if ranking is not None:
+            if add:
+                ranking.add(int(_id), **values)
+            else:
+                ranking.set(int(_id), **values)
+
+        values.pop("name", None)
+
+        if values:
+            self.xp.set(guild_id, int(_id), add=add, **values)
+
+    """ XP ENGINE """
+
+    @Utils.resolve_guild_path
+    def load_xp(self, guild_id: int, _id: int = None) -> None:
+        """Loads the xp state of the guild (and of the user if given) in the xp engine"""
+        if not self.xp.is_loaded(guild_id):
+            self.xp.load(
+                guild_id,
+                self.model.get(
+                    f"{self.path}",
+                    fields=["prestige", "level", "xp", "xp_days", "xp_day"],
+                ),
+            )
+
+        if _id is not None and not self.xp.is_loaded(guild_id, _id):
+            db_user = self.get_user(guild_id, _id)
+            self.xp.set(
+                guild_id,
+                _id,
+                db_user.get("prestige") or 0,
+                db_user.get("level") or 1,
+                db_user.get("xp") or 0,
+            )
+
+    def award_xp(self, guild_id: int, _id: int, value: int) -> Optional[int]:
+        """Gives the xp to the user in memory and returns its new level if it passed one, the user must be loaded"""
+        level = self.xp.award(
+            guild_id, _id, value, int(self.bot.configs[guild_id]["xp"]["max_lvl"])
+        )
+        ranking = self.rankings.get(guild_id)
+
+        if ranking is not None:
+            _, new_level, xp = self.xp.get(guild_id, _id)
+            ranking.set(_id, level=new_level, xp=xp)
+
+        return level
+
+    @Utils.resolve_guild_path
+    def transform_xp(self, guild_id: int, transform) -> dict:
+        """Applies the transformation to the prestige, level and xp of every user of the guild and writes the modified ones
+
+        The transformation runs on the xp engine state under its lock so the xp awarded meanwhile isn't lost
+        """
+        self.load_xp(guild_id)
+        changes = self.xp.apply(guild_id, transform)
+
+        if not changes:
+            return changes
+
+        self.xp.flush(guild_id)
+
+        for _id, (prestige, level, xp) in changes.items():
+            self.__xp_changed(guild_id, _id, prestige=prestige, level=level, xp=xp)
+
+        self.cache.invalidate(guild_id)
+        return changes
+
     """ CREATION & DELETION """
 
     @Utils.resolve_guild_path
     def create_user(self, guild_id: int, _id: int, name: str) -> None:
-        self.model.create(
-            f"{self.path}/{_id}",
-            args={
-                "id": _id,
-                "name": name,
-                "muted": False,
-                "xp": 0,
-                "level": 1,
-                "prestige": 0,
-            },
-        )
+        user = {
+            "id": _id,
+            "name": name,
+            "muted": False,
+            "xp": 0,
+            "level": 1,
+            "prestige": 0,
+        }
+        self.model.create(f"{self.path}/{_id}", args=user)
+        self.cache.set(guild_id, _id, user)
+        self.__xp_changed(guild_id, _id, prestige=0, level=1, xp=0, name=name)
 
     @Utils.resolve_guild_path
     def update_user(self, guild_id: int, _id: int, name: str) -> None:
@@ -119,6 +244,8 @@ class User:
                 "name": name,
             },
         )
+        self.cache.update(guild_id, _id, {"name": name})
+        self.__xp_changed(guild_id, _id, name=name)
 
     """ SANCTIONS """
 
@@ -139,6 +266,7 @@ class User:
                 "reason": reason,
             },
         )
+        self.cache.invalidate(guild_id, _id)
 
     @Utils.resolve_guild_path
     @__check_user_exists
@@ -149,6 +277,7 @@ class User:
     @__check_user_exists
     def clear_warns(self, guild_id: int, _id: int) -> None:
         self.model.delete(f"{self.path}/{_id}/warns")
+        self.cache.invalidate(guild_id, _id)
 
     @Utils.resolve_guild_path
     @__check_user_exists
@@ -176,11 +305,13 @@ class User:
             },
         )
         self.model.update(f"{self.path}/{_id}", args={"muted": True})
+        self.cache.invalidate(guild_id, _id)
 
     @Utils.resolve_guild_path
     @__check_user_exists
     def unmute_user(self, guild_id: int, _id: int) -> None:
         self.model.update(f"{self.path}/{_id}", args={"muted": False})
+        self.cache.update(guild_id, _id, {"muted": False})
 
     @Utils.resolve_guild_path
     @__check_user_exists
@@ -195,6 +326,8 @@ class User:
 
                 x += 1
 
+            self.cache.invalidate(guild_id, _id)
+
     @Utils.resolve_guild_path
     @__check_user_exists
     def get_last_mute(self, guild_id: int, _id: int) -> dict:
@@ -220,32 +353,41 @@ class User:
                 "reason": reason,
             },
         )
+        self.cache.invalidate(guild_id, _id)
 
     @Utils.resolve_guild_path
     @__check_user_exists
     def unban_user(
         self, guild_id: int, _id: int, at: float, by: str, reason: str = None
     ) -> None:
-        self.model.create(
-            f"{self.path}/{_id}/unban/{int(at)}",
-            args={
-                "at": datetime.fromtimestamp(at).strftime("%d/%m/%Y, %H:%M:%S"),
-                "at_s": at,
-                "by": by,
-                "reason": reason,
-                "original_ban": self.model.get(f"{self.path}/{_id}/ban"),
-            },
-        )
-        self.model.delete(f"{self.path}/{_id}/ban")
+        original_ban = self.model.get(f"{self.path}/{_id}/ban")
+
+        with self.batch():
+            self.model.create(
+                f"{self.path}/{_id}/unban/{int(at)}",
+                args={
+                    "at": datetime.fromtimestamp(at).strftime("%d/%m/%Y, %H:%M:%S"),
+                    "at_s": at,
+                    "by": by,
+                    "reason": reason,
+                    "original_ban": original_ban,
+                },
+            )
+            self.model.delete(f"{self.path}/{_id}/ban")
+
+        self.cache.invalidate(guild_id, _id)
 
     """ XP """
 
     @Utils.resolve_guild_path
     @__check_user_exists
     def add_xp(self, guild_id: int, _id: int, value: int) -> None:
-        path = f"{self.path}/{_id}"
-        xp = (self.model.get(f"{path}"))["xp"]
-        self.model.update(f"{self.path}/{_id}", args={"xp": xp + value})
+        self.xp.flush(guild_id, _id)
+        self.model.update(
+            f"{self.path}/{_id}", args={"xp": self.model.increment(value)}
+        )
+        self.cache.add(guild_id, _id, "xp", value)
+        self.__xp_changed(guild_id, _id, add=True, xp=value)
 
     @Utils.resolve_guild_path
     @__check_user_exists
@@ -253,10 +395,15 @@ class User:
     def add_levels(
         self, guild_id: int, _id: int, value: int, warn: bool = False
     ) -> tuple:
-        path = f"{self.path}/{_id}"
-        level = (self.model.get(f"{path}"))["level"]
-        self.model.update(f"{self.path}/{_id}", args={"level": level + value})
-        return warn, value, level + value
+        self.xp.flush(guild_id, _id)
+        max_lvl = self.bot.configs[guild_id]["xp"]["max_lvl"]
+        level = self.model.transaction(
+            f"{self.path}/{_id}/level",
+            lambda level: min((level or 1) + value, max_lvl),
+        )
+        self.cache.update(guild_id, _id, {"level": level})
+        self.__xp_changed(guild_id, _id, level=level)
+        return warn, value, level
 
     @Utils.resolve_guild_path
     @__check_user_exists
@@ -264,15 +411,21 @@ class User:
     def remove_levels(
         self, guild_id: int, _id: int, value: int, warn: bool = False
     ) -> tuple:
-        path = f"{self.path}/{_id}"
-        level = (self.model.get(f"{path}"))["level"]
-        self.model.update(f"{self.path}/{_id}", args={"level": level - value})
-        return warn, value, level - value
+        self.xp.flush(guild_id, _id)
+        level = self.model.transaction(
+            f"{self.path}/{_id}/level", lambda level: max((level or 1) - value, 1)
+        )
+        self.cache.update(guild_id, _id, {"level": level})
+        self.__xp_changed(guild_id, _id, level=level)
+        return warn, value, level
 
     @Utils.resolve_guild_path
     @__check_user_exists
     def set_levels(self, guild_id: int, _id: int, level: int) -> None:
+        self.xp.flush(guild_id, _id)
         self.model.update(f"{self.path}/{_id}", args={"level": level})
+        self.cache.update(guild_id, _id, {"level": level})
+        self.__xp_changed(guild_id, _id, level=level)
 
     @Utils.resolve_guild_path
     @__check_user_exists
@@ -286,27 +439,30 @@ class User:
         xp: int = 0,
         warn: bool = False,
     ) -> bool:
-        db_user = self.get_user(guild_id, _id)
+        self.xp.flush(guild_id, _id)
         self.model.update(
             f"{self.path}/{_id}",
-            args={"prestige": db_user["prestige"] + value, "level": level, "xp": xp},
+            args={"prestige": self.model.increment(value), "level": level, "xp": xp},
         )
+        self.cache.update(guild_id, _id, {"level": level, "xp": xp})
+        self.cache.add(guild_id, _id, "prestige", value)
+        self.__xp_changed(guild_id, _id, add=True, prestige=value)
+        self.__xp_changed(guild_id, _id, level=level, xp=xp)
         return warn
 
     @Utils.resolve_guild_path
     @__check_user_exists
     def remove_prestige(self, guild_id: int, _id: int, xp: int, value: int = 1) -> None:
+        self.xp.flush(guild_id, _id)
         db_user = self.get_user(guild_id, _id)
-        self.model.update(
-            f"{self.path}/{_id}",
-            args={
-                "prestige": db_user["prestige"] - value
-                if db_user["prestige"] > 0
-                else 0,
-                "level": self.bot.configs[guild_id]["xp"]["max_lvl"],
-                "xp": xp,
-            },
-        )
+        updates = {
+            "prestige": db_user["prestige"] - value if db_user["prestige"] > 0 else 0,
+            "level": self.bot.configs[guild_id]["xp"]["max_lvl"],
+            "xp": xp,
+        }
+        self.model.update(f"{self.path}/{_id}", args=updates)
+        self.cache.update(guild_id, _id, updates)
+        self.__xp_changed(guild_id, _id, **updates)
 
     @Utils.resolve_guild_path
     @__check_user_exists
@@ -315,27 +471,46 @@ class User:
             f"{self.path}/{_id}/prestige_pending",
             args={"confirmation_id": confirmation_id},
         )
+        self.cache.update(
+            guild_id, _id, {"prestige_pending": {"confirmation_id": confirmation_id}}
+        )
 
     @Utils.resolve_guild_path
     @__check_user_exists
     def cancel_prestige(self, guild_id: int, _id: int) -> None:
         self.model.delete(f"{self.path}/{_id}/prestige_pending")
+        self.cache.invalidate(guild_id, _id)
 
     @Utils.resolve_guild_path
     @__check_user_exists
     def clear_xp(self, guild_id: int, _id: int) -> None:
+        self.xp.flush(guild_id, _id)
         self.model.update(f"{self.path}/{_id}", args={"xp": 0})
+        self.cache.update(guild_id, _id, {"xp": 0})
+        self.__xp_changed(guild_id, _id, xp=0)
 
     """ OTHERS """
 
     @Utils.resolve_guild_path
     @__check_user_exists
     def get_user(self, guild_id: int, _id: int) -> OrderedDict:
-        return self.model.get(f"{self.path}/{_id}")
+        record = self.__get_record(guild_id, _id)
+        state = self.xp.get(guild_id, _id)
+
+        if record and state:
+            # The xp engine holds the latest values, they may not be written yet
+            record.update(zip(("prestige", "level", "xp"), state))
+
+        return record
 
     @Utils.resolve_guild_path
-    def get_users(self, guild_id: int) -> OrderedDict:
-        return self.model.get(f"{self.path}")
+    def get_users(self, guild_id: int, fields: list = None) -> OrderedDict:
+        self.xp.flush(guild_id)
+        return self.model.get(f"{self.path}", fields=fields)
+
+    @Utils.resolve_guild_path
+    def get_user_ids(self, guild_id: int) -> list:
+        return [int(key) for key in self.model.get(f"{self.path}", shallow=True)]
 
     @Utils.resolve_guild_path
     @__check_user_exists
@@ -348,6 +523,7 @@ class User:
                 "content": content,
             },
         )
+        self.cache.invalidate(guild_id, _id)
 
     @Utils.resolve_guild_path
     @__check_user_exists
@@ -358,17 +534,19 @@ class User:
     @__check_user_exists
     def clear_invites(self, guild_id: int, _id: int) -> None:
         self.model.delete(f"{self.path}/{_id}/invit_links")
+        self.cache.invalidate(guild_id, _id)
 
     @Utils.resolve_guild_path
     @__check_user_exists
     def get_commands_count(
         self, guild_id: int, _id: int, details: bool = False
     ) -> int or OrderedDict:
+        commands = self.__get_record(guild_id, _id).get("commands_count", OrderedDict())
+
         if details:
-            return self.model.get(f"{self.path}/{_id}/commands_count")
+            return commands
 
         count = 0
-        commands = self.model.get(f"{self.path}/{_id}/commands_count")
 
         for command in commands.values():
             count += command
@@ -378,65 +556,19 @@ class User:
     @Utils.resolve_guild_path
     @__check_user_exists
     def add_messages_count(self, guild_id: int, _id: int, channel_id: int) -> None:
-        counts = self.model.get(f"{self.path}/{_id}/messages_count")
-
-        if counts:
-            self.model.update(
-                f"{self.path}/{_id}/messages_count",
-                args={
-                    **{
-                        channel_id: (
-                            counts.pop(str(channel_id))
-                            if str(channel_id) in counts
-                            else 0
-                        )
-                        + 1
-                    },
-                    **counts,
-                },
-            )
-        else:
-            self.model.create(f"{self.path}/{_id}/messages_count", args={channel_id: 1})
+        self.counters.add(f"{self.path}/{_id}/messages_count/{channel_id}")
+        self.cache.increment(guild_id, _id, "messages_count", channel_id)
 
     @Utils.resolve_guild_path
     @__check_user_exists
     def add_command_count(self, guild_id: int, _id: int, command: str) -> None:
-        counts = self.model.get(f"{self.path}/{_id}/commands_count")
-
-        if counts:
-            self.model.update(
-                f"{self.path}/{_id}/commands_count",
-                args={
-                    **{command: (counts.pop(command) if command in counts else 0) + 1},
-                    **counts,
-                },
-            )
-        else:
-            self.model.create(f"{self.path}/{_id}/commands_count", args={command: 1})
+        self.counters.add(f"{self.path}/{_id}/commands_count/{command}")
+        self.cache.increment(guild_id, _id, "commands_count", command)
 
     @Utils.resolve_guild_path
     @__check_user_exists
     def add_voice_time(
         self, guild_id: int, _id: int, channel_id: int, value: int = 1
     ) -> None:
-        counts = self.model.get(f"{self.path}/{_id}/voice_count")
-
-        if counts:
-            self.model.update(
-                f"{self.path}/{_id}/voice_count",
-                args={
-                    **{
-                        channel_id: (
-                            counts.pop(str(channel_id))
-                            if str(channel_id) in counts
-                            else 0
-                        )
-                        + value
-                    },
-                    **counts,
-                },
-            )
-        else:
-            self.model.create(
-                f"{self.path}/{_id}/voice_count", args={channel_id: value}
-            )
+        self.counters.add(f"{self.path}/{_id}/voice_count/{channel_id}", value)
+        self.cache.increment(guild_id, _id, "voice_count", channel_id, value)
@@ -0,0 +1,117 @@
+from os import getenv
+from threading import RLock
+from time import time
+from typing import Optional
+
+from data.Database.flusher import Pending, PeriodicFlusher
+
+
+class VoiceSessions(PeriodicFlusher):
+    """Voice sessions of the members, their time is counted on channel changes and periodically, and checkpointed to survive restarts"""
+
+    name = "voice sessions"
+    path = "voice_sessions"
+
+    def __init__(self, user_repo) -> None:
+        super().__init__(
+            user_repo.model, float(getenv("VOICE_CHECKPOINT_INTERVAL", 900))
+        )
+        self.user_repo = user_repo
+        # [channel_id, since] by (guild_id, user_id), since being the last time counted
+        self.sessions = {}
+        self.ended = set()
+        self.lock = RLock()
+
+    def __count(self, key: tuple, channel_id: int, since: float, now: float) -> None:
+        if now > since:
+            self.user_repo.add_voice_time(key[0], key[1], channel_id, now - since)
+
+    def join(self, guild_id: int, user_id: int, channel_id: int) -> None:
+        """Starts the session of the member in the channel, ending its previous one"""
+        self.leave(guild_id, user_id)
+
+        with self.lock:
+            self.sessions[(guild_id, user_id)] = [channel_id, time()]
+            self.ended.discard((guild_id, user_id))
+
+    def leave(self, guild_id: int, user_id: int) -> None:
+        """Ends the session of the member and counts its time"""
+        with self.lock:
+            session = self.sessions.pop((guild_id, user_id), None)
+
+            if session is None:
+                return
+
+            self.ended.add((guild_id, user_id))
+
+        self.__count((guild_id, user_id), *session, time())
+
+    def end_guild(self, guild_id: int) -> None:
+        """Ends the sessions of every member of the guild and counts their time"""
+        with self.lock:
+            keys = [key for key in self.sessions if key[0] == guild_id]
+
+        for key in keys:
+            self.leave(*key)
+
+    def restore(self, active: dict) -> None:
+        """Resumes the checkpointed sessions of the members still in the same channel and starts the ones of the other active members
+
+        Keyword arguments:
+        active -- The channel id of every member currently in a voice channel by (guild_id, user_id)
+        """
+        checkpoint = self.model.get(self.path) or {}
+
+        with self.lock:
+            for guild_id, users in checkpoint.items():
+                for user_id, session in (users or {}).items():
+                    key = (int(guild_id), int(user_id))
+
+                    if key in self.sessions:
+                        # Already tracked since the bot is connected (reconnection)
+                        continue
+                    elif active.get(key) == int(session["channel_id"]):
+                        self.sessions[key] = [active[key], session["since"]]
+                    else:
+                        # The member left while the bot was offline, the time since the checkpoint is unknown
+                        self.ended.add(key)
+
+            for key in [key for key in self.sessions if key not in active]:
+                # Left during a disconnection, the time since the last count is unknown
+                del self.sessions[key]
+                self.ended.add(key)
+
+            now = time()
+            for key, channel_id in active.items():
+                if key not in self.sessions:
+                    self.sessions[key] = [channel_id, now]
+
+        self.flush()
+
+    def collect(self) -> Optional[Pending]:
+        """Counts the time of the running sessions and takes their checkpoint"""
+        now = time()
+        args = {}
+
+        with self.lock:
+            sessions = {key: list(session) for key, session in self.sessions.items()}
+            ended, self.ended = self.ended, set()
+
+            for session in self.sessions.values():
+                session[1] = now
+
+        for key, (channel_id, since) in sessions.items():
+            self.__count(key, channel_id, since, now)
+            args[f"{key[0]}/{key[1]}"] = {"channel_id": channel_id, "since": now}
+
+        for key in ended - set(sessions):
+            args[f"{key[0]}/{key[1]}"] = None
+
+        if not args:
+            return None
+
+        def rollback():
+            with self.lock:
+                self.ended |= ended
+
+        return self.path, args, rollback
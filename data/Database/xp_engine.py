@@ -0,0 +1,316 @@
+from array import array
+from os import getenv
+from threading import RLock
+from time import time
+from typing import List, Optional, Tuple
+
+from data.Database.flusher import Pending, PeriodicFlusher
+from data.xp_curve import xp_to_next_level
+
+# Number of daily xp buckets kept per member, it bounds the longest leaderboard window
+WINDOW_DAYS = 32
+
+
+def today() -> int:
+    """Returns the number of UTC days since the epoch"""
+    return int(time() // 86400)
+
+
+class GuildXp:
+    """Prestige, level and xp of the members of a guild stored in compact arrays indexed by slot"""
+
+    __slots__ = ("slots", "ids", "prestige", "level", "xp", "days", "day", "dirty")
+
+    def __init__(self, db_users: dict) -> None:
+        self.slots = {}
+        self.ids = array("q")
+        self.prestige = array("i")
+        self.level = array("i")
+        self.xp = array("q")
+        # Ring of the xp gained by day, WINDOW_DAYS buckets per slot, day being the last recorded one
+        self.days = array("i")
+        self.day = array("i")
+        self.dirty = set()
+
+        for user_id, db_user in db_users.items():
+            self.add(
+                int(user_id),
+                db_user.get("prestige") or 0,
+                db_user.get("level") or 1,
+                db_user.get("xp") or 0,
+                db_user.get("xp_days"),
+                db_user.get("xp_day") or 0,
+            )
+
+    def add(
+        self,
+        user_id: int,
+        prestige: int = 0,
+        level: int = 1,
+        xp: int = 0,
+        days: list = None,
+        day: int = 0,
+    ) -> int:
+        """Gives a slot to the member and returns it"""
+        slot = len(self.ids)
+        self.slots[user_id] = slot
+        self.ids.append(user_id)
+        self.prestige.append(prestige)
+        self.level.append(level)
+        self.xp.append(xp)
+
+        if isinstance(days, dict):
+            days = [days.get(str(index)) for index in range(WINDOW_DAYS)]
+
+        days = list(days or [])[:WINDOW_DAYS]
+        self.days.extend(
+            [value or 0 for value in days] + [0] * (WINDOW_DAYS - len(days))
+        )
+        self.day.append(day)
+        return slot
+
+    def row(self, slot: int) -> dict:
+        return {
+            "prestige": self.prestige[slot],
+            "level": self.level[slot],
+            "xp": self.xp[slot],
+            "xp_days": self.days[
+                slot * WINDOW_DAYS : (slot + 1) * WINDOW_DAYS
+            ].tolist(),
+            "xp_day": self.day[slot],
+        }
+
+    def record(self, slot: int, value: int, day: int) -> None:
+        """Adds the xp to the bucket of the day, clearing the buckets of the days without xp since the last one"""
+        base = slot * WINDOW_DAYS
+        last = self.day[slot]
+
+        if day > last:
+            for _day in range(max(last + 1, day - WINDOW_DAYS + 1), day + 1):
+                self.days[base + _day % WINDOW_DAYS] = 0
+
+            self.day[slot] = last = day
+        elif day <= last - WINDOW_DAYS:
+            return
+
+        self.days[base + day % WINDOW_DAYS] += value
+
+    def window(self, slot: int, days: int, day: int) -> int:
+        """Returns the xp gained during the given number of days until the day included"""
+        base = slot * WINDOW_DAYS
+        last = self.day[slot]
+
+        return sum(
+            self.days[base + _day % WINDOW_DAYS]
+            for _day in range(
+                max(day - days + 1, last - WINDOW_DAYS + 1), min(last, day) + 1
+            )
+        )
+
+
+class XpEngine(PeriodicFlusher):
+    """In-memory xp state of the loaded guilds, the modified members are written back periodically in a single update"""
+
+    name = "xp"
+
+    def __init__(self, model, innerpath: str) -> None:
+        super().__init__(model, float(getenv("XP_FLUSH_INTERVAL", 30)))
+        self.innerpath = innerpath
+        self.guilds = {}
+        self.unloaded = []
+        self.lock = RLock()
+
+    def is_loaded(self, guild_id: int, user_id: int = None) -> bool:
+        with self.lock:
+            state = self.guilds.get(guild_id)
+            return state is not None and (user_id is None or user_id in state.slots)
+
+    def load(self, guild_id: int, db_users: dict) -> None:
+        """Loads the xp state of the guild from its users records if it isn't already loaded"""
+        with self.lock:
+            if guild_id in self.guilds:
+                return
+
+            for unloaded in self.unloaded:
+                # The guild still has pending changes, its state is more recent than the records
+                if unloaded[0] == guild_id:
+                    self.unloaded.remove(unloaded)
+                    self.guilds[guild_id] = unloaded[1]
+                    return
+
+            self.guilds[guild_id] = GuildXp(db_users or {})
+
+    def unload(self, guild_id: int) -> None:
+        """Releases the xp state of the guild, its pending changes are written with the next flush"""
+        with self.lock:
+            state = self.guilds.pop(guild_id, None)
+
+            if state is not None and state.dirty:
+                self.unloaded.append((guild_id, state))
+
+    def get(self, guild_id: int, user_id: int) -> Optional[Tuple[int, int, int]]:
+        """Returns the (prestige, level, xp) of the member or None if it isn't loaded"""
+        with self.lock:
+            state = self.guilds.get(guild_id)
+            slot = None if state is None else state.slots.get(user_id)
+
+            if slot is None:
+                return None
+
+            return state.prestige[slot], state.level[slot], state.xp[slot]
+
+    def pending(self, guild_id: int) -> List[Tuple[int, int, int, int]]:
+        """Returns the (user_id, prestige, level, xp) of the members of the guild modified since the last flush"""
+        with self.lock:
+            state = self.guilds.get(guild_id)
+
+            if state is None:
+                return []
+
+            return [
+                (
+                    state.ids[slot],
+                    state.prestige[slot],
+                    state.level[slot],
+                    state.xp[slot],
+                )
+                for slot in state.dirty
+            ]
+
+    def set(
+        self,
+        guild_id: int,
+        user_id: int,
+        prestige: int = None,
+        level: int = None,
+        xp: int = None,
+        add: bool = False,
+    ) -> None:
+        """Replaces (or adds to, with add) the given values of the member, it is only kept in memory if the guild is loaded"""
+        with self.lock:
+            state = self.guilds.get(guild_id)
+
+            if state is None:
+                return
+
+            slot = state.slots.get(user_id)
+
+            if slot is None:
+                slot = state.add(user_id)
+
+            for values, value in (
+                (state.prestige, prestige),
+                (state.level, level),
+                (state.xp, xp),
+            ):
+                if value is not None:
+                    values[slot] = values[slot] + value if add else value
+
+    def award(
+        self, guild_id: int, user_id: int, value: int, max_lvl: int
+    ) -> Optional[int]:
+        """Gives the xp to the member and returns its new level if it passed one, the member must be loaded"""
+        with self.lock:
+            state = self.guilds[guild_id]
+            slot = state.slots[user_id]
+            level = state.level[slot]
+            state.dirty.add(slot)
+            state.record(slot, value, today())
+
+            if state.xp[slot] + value < xp_to_next_level(level) or level >= max_lvl:
+                state.xp[slot] += value
+                return None
+
+            state.level[slot] = level + 1
+            state.xp[slot] = 0
+            return level + 1
+
+    def apply(self, guild_id: int, transform) -> dict:
+        """Applies the transformation to the columns of the loaded guild, the modified members are written with the next flush
+
+        Returns the new (prestige, level, xp) of the modified members by id
+        """
+        with self.lock:
+            state = self.guilds[guild_id]
+            columns = (
+                state.prestige.tolist(),
+                state.level.tolist(),
+                state.xp.tolist(),
+            )
+            changes = {}
+
+            for slot, (old, row) in enumerate(
+                zip(zip(*columns), zip(*transform(*columns)))
+            ):
+                if old != row:
+                    state.prestige[slot], state.level[slot], state.xp[slot] = row
+                    state.dirty.add(slot)
+                    changes[state.ids[slot]] = row
+
+            return changes
+
+    def window_ranking(self, guild_id: int, days: int) -> List[Tuple[int, int]]:
+        """Returns the (user_id, xp) of the members who gained xp during the last days, sorted by xp"""
+        days = min(days, WINDOW_DAYS)
+        day = today()
+
+        with self.lock:
+            state = self.guilds.get(guild_id)
+
+            if state is None:
+                return []
+
+            totals = [
+                (user_id, state.window(slot, days, day))
+                for user_id, slot in state.slots.items()
+            ]
+
+        return sorted(
+            (row for row in totals if row[1] > 0), key=lambda row: (-row[1], row[0])
+        )
+
+    def collect(self, guild_id: int = None, user_id: int = None) -> Optional[Pending]:
+        """Takes the modified members, of the guild or only the member if given"""
+        args = {}
+        pending = []
+
+        with self.lock:
+            if guild_id is None:
+                states = [(_id, state, False) for _id, state in self.guilds.items()]
+                states += [(_id, state, True) for _id, state in self.unloaded]
+                self.unloaded = []
+            elif guild_id in self.guilds:
+                states = [(guild_id, self.guilds[guild_id], False)]
+            else:
+                states = []
+
+            for _guild_id, state, unloaded in states:
+                if user_id is None:
+                    slots = set(state.dirty)
+                else:
+                    slots = {state.slots.get(user_id)} & state.dirty
+
+                if not slots:
+                    continue
+
+                state.dirty -= slots
+                pending.append((_guild_id, state, unloaded, slots))
+
+                for slot in slots:
+                    path = f"guilds/{_guild_id}/{self.innerpath}/{state.ids[slot]}"
+                    for key, value in state.row(slot).items():
+                        args[f"{path}/{key}"] = value
+
+        if not args:
+            return None
+
+        def rollback():
+            # Mark the members as modified again so they're written with the next flush
+            with self.lock:
+                for _guild_id, state, unloaded, slots in pending:
+                    state.dirty |= slots
+
+                    if unloaded:
+                        self.unloaded.append((_guild_id, state))
+
+        return "", args, rollback
@@ -0,0 +1,107 @@
+from math import floor
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from data.xp_curve import XpCurve
+
+# A transformation receives the prestige, level and xp columns of the members and returns the new ones
+Columns = Tuple[List[int], List[int], List[int]]
+Transform = Callable[[List[int], List[int], List[int]], Columns]
+
+
+def clamp_levels(max_lvl: int) -> Transform:
+    """Brings the members above the max level back to it"""
+
+    def transform(prestiges: list, levels: list, xps: list) -> Columns:
+        return prestiges, [min(level, max_lvl) for level in levels], xps
+
+    return transform
+
+
+def decay_xp(curve: XpCurve, rate: float) -> Transform:
+    """Removes a part (0 < rate <= 1) of the xp accumulated in the current prestige, levels included"""
+
+    def transform(prestiges: list, levels: list, xps: list) -> Columns:
+        totals = [
+            floor(curve.total_xp(level, xp) * (1 - rate))
+            for level, xp in zip(levels, xps)
+        ]
+        levels, xps = zip(*map(curve.from_total_xp, totals)) if totals else ((), ())
+        return prestiges, list(levels), list(xps)
+
+    return transform
+
+
+def reset_season(keep_prestiges: bool = True) -> Transform:
+    """Brings every member back to the level 1 without xp"""
+
+    def transform(prestiges: list, levels: list, xps: list) -> Columns:
+        return (
+            prestiges if keep_prestiges else [0] * len(prestiges),
+            [1] * len(levels),
+            [0] * len(xps),
+        )
+
+    return transform
+
+
+def remove_prestige(curve: XpCurve, prestige: int) -> Transform:
+    """Brings the members of the removed prestige back to the previous one, their xp converted at the max level"""
+
+    def transform(prestiges: list, levels: list, xps: list) -> Columns:
+        removed = [p >= prestige for p in prestiges]
+        return (
+            [p - 1 if r else p for p, r in zip(prestiges, removed)],
+            [curve.max_lvl if r else level for level, r in zip(levels, removed)],
+            [
+                curve.total_xp(level, xp) if r else xp
+                for level, xp, r in zip(levels, xps, removed)
+            ],
+        )
+
+    return transform
+
+
+def purge_prestiges(curve: XpCurve) -> Transform:
+    """Converts the prestiges of the members back into xp at the max level"""
+
+    def transform(prestiges: list, levels: list, xps: list) -> Columns:
+        return (
+            [0] * len(prestiges),
+            [
+                curve.max_lvl if prestige > 0 else level
+                for prestige, level in zip(prestiges, levels)
+            ],
+            [
+                curve.purged_xp(prestige, level, xp)
+                for prestige, level, xp in zip(prestiges, levels, xps)
+            ],
+        )
+
+    return transform
+
+
+async def run_xp_job(
+    user_repo,
+    guild_id: int,
+    transform: Transform,
+    progress: Optional[Callable[[str], Awaitable]] = None,
+) -> dict:
+    """Applies the transformation to every member of the guild and writes the modified ones in a single update
+
+    Keyword arguments:
+    user_repo -- The user repository
+    guild_id -- The id of the guild
+    transform -- The transformation of the prestige, level and xp columns
+    progress -- An optional coroutine function receiving the progress messages
+
+    Returns the new (prestige, level, xp) of the modified members by id
+    """
+    if progress:
+        await progress("Applying the changes to the members...")
+
+    changes = await user_repo.aio.transform_xp(guild_id, transform)
+
+    if progress:
+        await progress(f"Done, `{len(changes)}` members modified!")
+
+    return changes
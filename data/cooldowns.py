@@ -0,0 +1,39 @@
+from time import monotonic
+from typing import Hashable
+
+# Default number of seconds between two xp gains of a member by message
+XP_COOLDOWN = 5
+
+
+class Cooldowns:
+    """Expiry timestamps by key, the expired keys are only removed when they're checked or by a sweep"""
+
+    def __init__(self) -> None:
+        self.expiries = {}
+        self.next_sweep_size = 1024
+
+    def hit(self, key: Hashable, window: float) -> bool:
+        """Starts the cooldown of the key and returns True if it wasn't already in one"""
+        now = monotonic()
+        expiry = self.expiries.get(key)
+
+        if expiry is not None and expiry > now:
+            return False
+
+        self.expiries[key] = now + window
+
+        if len(self.expiries) >= self.next_sweep_size:
+            self.sweep(now)
+
+        return True
+
+    def sweep(self, now: float = None) -> None:
+        """Removes the expired keys, the next sweep happens once the size doubled"""
+        now = now or monotonic()
+        self.expiries = {
+            key: expiry for key, expiry in self.expiries.items() if expiry > now
+        }
+        self.next_sweep_size = max(1024, 2 * len(self.expiries))
+
+    def __len__(self) -> int:
+        return len(self.expiries)
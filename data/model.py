@@ -1,53 +1,275 @@
+from asyncio import get_running_loop
 from collections import OrderedDict
-from os import getenv
-from firebase_admin import credentials, db, initialize_app
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from copy import deepcopy
+from functools import partial
+from os import getenv, path
+from threading import RLock
+from typing import Optional
 
-from data.constants import FIREBASE_DATABASEURL
+from data.Backends import MemoryBackend, SqliteBackend
+from data.Backends.base import push_key, split_path
+
+# The batch collecting the writes of the current task or thread
+batch_context: ContextVar[Optional["Batch"]] = ContextVar("batch", default=None)
+
+
+def get_increment(value) -> Optional[int]:
+    """Returns the value added by an increment server value, None if it isn't one"""
+    if isinstance(value, dict) and len(value) == 1 and ".sv" in value:
+        return value[".sv"].get("increment")
+
+    return None
+
+
+def merge_write(old, new):
+    """Returns the value of a path written twice, an increment adds to the previous value instead of replacing it"""
+    increment = get_increment(new)
+
+    if increment is None:
+        return new
+
+    previous = get_increment(old)
+
+    if previous is not None:
+        return {".sv": {"increment": previous + increment}}
+    elif isinstance(old, (int, float)) and not isinstance(old, bool):
+        return old + increment
+
+    return new
+
+
+def current_batch() -> Optional["Batch"]:
+    """Returns the open batch of the current task or thread"""
+    batch = batch_context.get()
+    return batch if batch is not None and batch.open else None
+
+
+class Batch:
+    """Collects sets, updates and deletes and commits them as a single multi-path update"""
+
+    def __init__(self, model) -> None:
+        self.model = model
+        self.writes = {}
+        self.token = None
+        # The tasks created while the batch is open inherit it, their writes go directly to the database once it's closed
+        self.open = False
+        self.lock = RLock()
+
+    def __enter__(self):
+        # A batch opened inside another one adds its writes to the outer batch
+        if current_batch() is None:
+            self.token = batch_context.set(self)
+            self.open = True
+        return batch_context.get()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.token is None:
+            return
+
+        batch_context.reset(self.token)
+        self.token = None
+        self.open = False
+
+        if exc_type is None:
+            self.commit()
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self.token is None:
+            return
+
+        batch_context.reset(self.token)
+        self.token = None
+        self.open = False
+
+        if exc_type is None:
+            await self.acommit()
+
+    def write(self, path: str, value) -> None:
+        with self.lock:
+            self.__write("/".join(split_path(path)), value)
+
+    def __write(self, path: str, value) -> None:
+        for key in list(self.writes):
+            if key == path:
+                value = merge_write(self.writes.pop(key), value)
+            elif key.startswith(f"{path}/"):
+                del self.writes[key]
+            elif path.startswith(f"{key}/"):
+                # The path is inside a node already written so the value goes in that node
+                node = self.writes[key] = (
+                    deepcopy(self.writes[key])
+                    if isinstance(self.writes[key], dict)
+                    else {}
+                )
+
+                keys = path[len(key) + 1 :].split("/")
+
+                for child in keys[:-1]:
+                    if not isinstance(node.get(child), dict):
+                        node[child] = {}
+
+                    node = node[child]
+
+                node[keys[-1]] = merge_write(node.get(keys[-1]), value)
+                return
+
+        self.writes[path] = value
+
+    def create(self, path: str, event: str = "set", *, args: dict = "") -> None:
+        self.write(f"{path}/{push_key()}" if event == "push" else path, args)
+
+    def update(self, path: str, *, args: dict) -> None:
+        for key, value in args.items():
+            self.write(f"{path}/{key}", value)
+
+    def delete(self, path: str) -> None:
+        self.write(path, None)
+
+    def commit(self) -> None:
+        """Writes every collected operation at the common root of their paths"""
+        with self.lock:
+            writes, self.writes = self.writes, {}
+
+        if not writes:
+            return
+
+        paths = [key.split("/") for key in writes]
+        root = []
+
+        for keys in zip(*paths):
+            if len(set(keys)) > 1:
+                break
+
+            root.append(keys[0])
+
+        # The root has to stay a parent of every written path
+        root = root[: min(len(keys) for keys in paths) - 1]
+        self.model.backend.update(
+            "/".join(root),
+            {
+                "/".join(key.split("/")[len(root) :]): value
+                for key, value in writes.items()
+            },
+        )
+
+    async def acommit(self) -> None:
+        await self.model.run(self.commit)
 
 
 class Model:
-    ref = None
+    backend = None
+    executor = None
 
     @classmethod
     def setup(self):
-        cred = credentials.Certificate(
-            {
-                "type": getenv("type"),
-                "project_id": getenv("project_id"),
-                "private_key_id": getenv("private_key_id"),
-                "private_key": getenv("private_key"),
-                "client_email": getenv("client_email"),
-                "client_id": getenv("client_id"),
-                "auth_uri": getenv("auth_uri"),
-                "token_uri": getenv("token_uri"),
-                "auth_provider_x509_cert_url": getenv("auth_provider_x509_cert_url"),
-                "client_x509_cert_url": getenv("client_x509_cert_url"),
-            }
-        )
-        initialize_app(
-            cred,
-            {"databaseURL": FIREBASE_DATABASEURL or getenv("FIREBASE_DATABASEURL")},
-        )
+        backend = getenv("DATABASE_BACKEND", "firebase").lower()
+
+        if backend == "memory":
+            self.backend = MemoryBackend()
+        elif backend == "sqlite":
+            self.backend = SqliteBackend(
+                getenv("DATABASE_SQLITE_PATH", path.join("data", "omnitron.db"))
+            )
+        else:
+            # Imported here so the local backends don't need the firebase SDK
+            from data.Backends.firebase import FirebaseBackend
 
-        # Get a reference to the database service
-        self.ref = db.reference("dev/" if getenv("ENV") == "DEVELOPMENT" else "/")
+            self.backend = FirebaseBackend(
+                "dev/" if getenv("ENV") == "DEVELOPMENT" else "/"
+            )
+
+        # Bounded pool of workers running the blocking database calls off the event loop
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(getenv("DATABASE_POOL_SIZE", 10)),
+            thread_name_prefix="omnitron-db",
+        )
         return self
 
+    @classmethod
+    def close(self) -> None:
+        if self.executor:
+            self.executor.shutdown(wait=True)
+
+    """ SYNC """
+
     @classmethod
     def create(self, path: str, event: str = "set", *, args: dict = "") -> None:
-        if event == "push":
-            self.ref.child(path).push(args)
-        elif event == "set":
-            self.ref.child(path).set(args)
+        batch = current_batch()
+
+        if batch is not None:
+            return batch.create(path, event, args=args)
+
+        self.backend.create(path, event, args)
 
     @classmethod
     def update(self, path: str, *, args: dict) -> None:
-        return self.ref.child(path).update(args)
+        batch = current_batch()
+
+        if batch is not None:
+            return batch.update(path, args=args)
+
+        return self.backend.update(path, args)
 
     @classmethod
     def delete(self, path: str) -> None:
-        return self.ref.child(path).delete()
+        batch = current_batch()
+
+        if batch is not None:
+            return batch.delete(path)
+
+        return self.backend.delete(path)
+
+    @classmethod
+    def get(
+        self, path: str, *, shallow: bool = False, fields: list = None
+    ) -> OrderedDict:
+        """Returns the node at the path, only the keys of its children if shallow or only the given fields of its children"""
+        return self.backend.get(path, shallow, fields) or OrderedDict()
+
+    @classmethod
+    def transaction(self, path: str, function):
+        """Atomically replaces the node with the result of the function applied to its current value (compare-and-set, retried on conflicts), the transactions aren't part of the batches"""
+        return self.backend.transaction(path, function)
+
+    @classmethod
+    def batch(self) -> Batch:
+        """Returns a batch, the writes made while it is open are committed together when it closes"""
+        return Batch(self)
+
+    @staticmethod
+    def increment(value: int = 1) -> dict:
+        """Server value telling the database to add the value to the stored one"""
+        return {".sv": {"increment": value}}
+
+    """ ASYNC """
+
+    @classmethod
+    async def run(self, function, *args, **kwargs):
+        """Runs a blocking database call in the executor so it doesn't block the event loop"""
+        # The context is copied so an open batch also collects the writes made in the executor
+        return await get_running_loop().run_in_executor(
+            self.executor, copy_context().run, partial(function, *args, **kwargs)
+        )
+
+    @classmethod
+    async def acreate(self, path: str, event: str = "set", *, args: dict = "") -> None:
+        return await self.run(self.create, path, event, args=args)
+
+    @classmethod
+    async def aupdate(self, path: str, *, args: dict) -> None:
+        return await self.run(self.update, path, args=args)
+
+    @classmethod
+    async def adelete(self, path: str) -> None:
+        return await self.run(self.delete, path)
 
     @classmethod
-    def get(self, path: str) -> OrderedDict:
-        return self.ref.child(path).get() or OrderedDict()
+    async def aget(
+        self, path: str, *, shallow: bool = False, fields: list = None
+    ) -> OrderedDict:
+        return await self.run(self.get, path, shallow=shallow, fields=fields)
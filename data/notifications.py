@@ -0,0 +1,200 @@
+from asyncio import Semaphore, gather, sleep
+from collections import deque
+from logging import error
+from os import getenv
+from typing import Optional, Union
+
+from disnake import Embed, Forbidden, Guild, HTTPException, Member, NotFound
+
+
+class Delivery:
+    """Progress of a message sent to the moderators of a guild"""
+
+    __slots__ = ("guild_id", "recipients", "sent", "failed", "task")
+
+    def __init__(self, guild_id: int) -> None:
+        self.guild_id = guild_id
+        self.recipients = 0
+        self.sent = 0
+        self.failed = 0
+        self.task = None
+
+    @property
+    def done(self) -> bool:
+        return self.task is not None and self.task.done()
+
+
+class ModsNotifier:
+    """Sends the messages to the moderators in the background, each recipient once, with a bounded number of concurrent requests"""
+
+    def __init__(self, bot) -> None:
+        self.bot = bot
+        # Bounds the in-flight DMs of every delivery together, disnake waits on the rate limit buckets of each request
+        self.semaphore = Semaphore(int(getenv("MODS_DM_CONCURRENCY", 5)))
+        self.pending = set()
+        self.deliveries = deque(maxlen=int(getenv("MODS_DELIVERIES_HISTORY", 100)))
+        # Seconds during which the alerts of a guild are collected into a single digest
+        self.window = float(getenv("MODS_ALERTS_WINDOW", 3))
+        # (delivery, count by alert) of the guilds collecting alerts
+        self.digests = {}
+
+    def __start(self, delivery: Delivery, coro) -> Delivery:
+        delivery.task = self.bot.loop.create_task(coro)
+        self.pending.add(delivery.task)
+        delivery.task.add_done_callback(self.pending.discard)
+        self.deliveries.append(delivery)
+        return delivery
+
+    def notify(self, message: str, guild_id: int, em: Embed = None) -> Delivery:
+        """Starts the delivery of the message and returns it without waiting for it"""
+        delivery = Delivery(guild_id)
+        return self.__start(delivery, self.deliver(delivery, message, guild_id, em))
+
+    def alert(self, message: str, guild_id: int) -> Delivery:
+        """Adds the message to the digest of the guild, delivered once the window is over, and returns the delivery of the digest"""
+        digest = self.digests.get(guild_id)
+
+        if digest is None:
+            delivery = Delivery(guild_id)
+            digest = self.digests[guild_id] = (delivery, {})
+            self.__start(delivery, self.deliver_digest(delivery))
+
+        digest[1][message] = digest[1].get(message, 0) + 1
+        return digest[0]
+
+    async def deliver_digest(self, delivery: Delivery) -> None:
+        """Sends the alerts collected during the window, a single one as is and several ones in one embed"""
+        await sleep(self.window)
+        _, alerts = self.digests.pop(delivery.guild_id)
+
+        if len(alerts) == 1 and sum(alerts.values()) == 1:
+            return await self.deliver(delivery, next(iter(alerts)), delivery.guild_id)
+
+        await self.deliver(
+            delivery,
+            f"⚠️ - {sum(alerts.values())} alerts in the last {self.window:g} seconds!",
+            delivery.guild_id,
+            self.get_digest_embed(alerts),
+        )
+
+    def get_digest_embed(self, alerts: dict) -> Embed:
+        """Lists the alerts with their number of occurrences, within the embed description limit"""
+        lines = [
+            f"`x{count}` {alert}" if count > 1 else alert
+            for alert, count in alerts.items()
+        ]
+        description = ""
+
+        for index, line in enumerate(lines):
+            if len(description) + len(line) + 1 > 4000:
+                description += f"\n... and {len(lines) - index} other alert(s)"
+                break
+
+            description += f"{line}\n"
+
+        return Embed(
+            colour=self.bot.color, title="Moderators alerts", description=description
+        )
+
+    async def deliver(
+        self, delivery: Delivery, message: str, guild_id: int, em: Embed = None
+    ) -> None:
+        try:
+            guild = self.bot.get_guild(guild_id) or await self.bot.fetch_guild(guild_id)
+
+            if "mods_channel" in self.bot.configs[guild_id]:
+                try:
+                    await self.bot.configs[guild_id]["mods_channel"].send(
+                        message, embed=em
+                    )
+                    delivery.recipients = delivery.sent = 1
+                    return
+                except Forbidden:
+                    message += f"\nAnd also in the channel {self.bot.configs[guild_id]['mods_channel'].mention}!"
+
+            message += f"\n\nIn the guild -> `{guild}` (ID: `{guild_id}`)"
+
+            if not self.bot.moderators[guild_id]:
+                return await self.send_to_owners(delivery, guild, message, em)
+
+            recipients = self.get_recipients(guild, self.bot.moderators[guild_id])
+            delivery.recipients = len(recipients)
+            await gather(
+                *[
+                    self.send(delivery, guild, recipient, message, em)
+                    for recipient in recipients.values()
+                ]
+            )
+        except Exception as e:
+            error(
+                f"Couldn't send a message to the moderators of the guild {guild_id}: {type(e).__name__}: {e}"
+            )
+
+    @staticmethod
+    def get_recipients(guild: Guild, moderators: list) -> dict:
+        """Returns the members, or the ids of the uncached ones, by id, the members of several moderator roles only once"""
+        recipients = {}
+
+        for _id in moderators:
+            role = guild.get_role(int(_id))
+
+            if role is None:
+                recipients.setdefault(int(_id), guild.get_member(int(_id)) or int(_id))
+                continue
+
+            for member in role.members:
+                if not member.bot:
+                    recipients[member.id] = member
+
+        return recipients
+
+    async def send(
+        self,
+        delivery: Delivery,
+        guild: Guild,
+        recipient: Union[Member, int],
+        message: str,
+        em: Optional[Embed],
+    ) -> None:
+        async with self.semaphore:
+            try:
+                if isinstance(recipient, int):
+                    recipient = await guild.fetch_member(recipient)
+
+                await recipient.send(message, embed=em)
+                delivery.sent += 1
+            except (Forbidden, NotFound):
+                delivery.failed += 1
+            except HTTPException as e:
+                delivery.failed += 1
+                error(
+                    f"Couldn't send a message to the moderator {recipient} of the guild {guild.id}: {type(e).__name__}: {e}"
+                )
+
+    async def send_to_owners(
+        self, delivery: Delivery, guild: Guild, message: str, em: Optional[Embed]
+    ) -> None:
+        """Sends the message to the owner of the guild or to the owner of the bot if it can't"""
+        delivery.recipients = 1
+
+        try:
+            guild_owner = guild.owner or await guild.fetch_member(int(guild.owner_id))
+            await guild_owner.send(message, embed=em)
+        except (Forbidden, NotFound):
+            bot_owner = self.bot.owner
+
+            if not bot_owner:
+                bot_owner = await self.bot.fetch_user(
+                    int(
+                        self.bot.owner_id or list(self.bot.owner_ids)[0]
+                        if self.bot.owner_ids
+                        else self.bot.get_ownerid()
+                    )
+                )
+
+            await bot_owner.send(
+                f"{message}\nAnd couldn't send a message to the owner of the server!",
+                embed=em,
+            )
+
+        delivery.sent = 1
@@ -0,0 +1,62 @@
+from typing import Tuple
+
+from disnake import Member
+
+from data.runtime_config import GuildRuntimeConfig
+
+
+class PermissionCache:
+    """Moderator and dj statuses of the members by guild, an entry stays valid as long as the roles of the member don't change"""
+
+    def __init__(self) -> None:
+        # (fingerprint, (is_mod, is_dj)) by member id by guild id
+        self.guilds = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(member: Member) -> tuple:
+        # The sorted role ids of the member, cheaper to read than member.roles, and the owner who has every permission
+        return member.guild.owner_id, tuple(member._roles)
+
+    def resolve(self, member: Member, config: GuildRuntimeConfig) -> Tuple[bool, bool]:
+        """Returns if the member is a moderator and a dj of its guild"""
+        entries = self.guilds.setdefault(member.guild.id, {})
+        fingerprint = self.fingerprint(member)
+        entry = entries.get(member.id)
+
+        if entry is not None and entry[0] == fingerprint:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        role_ids = fingerprint[1]
+        is_admin = member.guild_permissions.administrator
+        statuses = (
+            member.id in config.moderators
+            or not config.moderators.isdisjoint(role_ids)
+            or is_admin,
+            not config.djs
+            or member.id in config.djs
+            or not config.djs.isdisjoint(role_ids)
+            or is_admin,
+        )
+        entries[member.id] = (fingerprint, statuses)
+        return statuses
+
+    def invalidate(self, guild_id: int, member_id: int = None) -> None:
+        """Forgets the statuses of the member or of every member of the guild"""
+        if member_id is None:
+            self.guilds.pop(guild_id, None)
+        else:
+            self.guilds.get(guild_id, {}).pop(member_id, None)
+
+    def stats(self) -> dict:
+        """Returns the number of hits and misses, the hit rate and the number of cached members"""
+        calls = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / calls if calls else 0,
+            "size": sum(len(entries) for entries in self.guilds.values()),
+        }
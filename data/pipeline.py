@@ -0,0 +1,67 @@
+from collections import defaultdict
+from time import perf_counter
+from typing import Awaitable, Callable, Optional
+
+from disnake import Message
+from disnake.ext.commands import Context
+
+
+class MessageState:
+    """What the stages of the pipeline know about a message, shared from one stage to the next"""
+
+    __slots__ = ("message", "prefix", "is_command", "ctx")
+
+    def __init__(self, message: Message) -> None:
+        self.message = message
+        self.prefix: Optional[str] = None
+        self.is_command = False
+        # Only built by the command stage, for the messages starting with the prefix
+        self.ctx: Optional[Context] = None
+
+
+# A stage returns True to stop the processing of the message
+Stage = Callable[[MessageState], Awaitable[Optional[bool]]]
+
+
+class MessagePipeline:
+    """Ordered stages run once over every message, each one can stop the following ones"""
+
+    def __init__(self) -> None:
+        self.stages = []
+        # [calls, total seconds] by stage name
+        self.timings = defaultdict(lambda: [0, 0.0])
+
+    def add_stage(self, name: str, stage: Stage, before: str = None) -> None:
+        """Adds the stage at the end of the pipeline or before the given stage"""
+        self.remove_stage(name)
+        names = [_name for _name, _ in self.stages]
+        index = names.index(before) if before in names else len(self.stages)
+        self.stages.insert(index, (name, stage))
+
+    def remove_stage(self, name: str) -> None:
+        self.stages = [(_name, stage) for _name, stage in self.stages if _name != name]
+
+    async def process(self, message: Message) -> MessageState:
+        state = MessageState(message)
+
+        for name, stage in self.stages:
+            start = perf_counter()
+
+            try:
+                stop = await stage(state)
+            finally:
+                timing = self.timings[name]
+                timing[0] += 1
+                timing[1] += perf_counter() - start
+
+            if stop:
+                break
+
+        return state
+
+    def stats(self) -> dict:
+        """Returns the number of calls and the average duration in milliseconds of every stage"""
+        return {
+            name: {"calls": calls, "avg_ms": total * 1000 / calls if calls else 0}
+            for name, (calls, total) in self.timings.items()
+        }
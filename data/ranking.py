@@ -0,0 +1,102 @@
+from bisect import bisect_left, insort
+from threading import RLock
+from typing import Iterator, Optional
+
+
+class XpRanking:
+    """Members of a guild sorted by prestige, level and xp, kept up to date by the xp writes"""
+
+    def __init__(self, db_users: dict) -> None:
+        self.lock = RLock()
+        self.scores = {}
+        self.names = {}
+
+        for user_id, db_user in db_users.items():
+            self.scores[int(user_id)] = (
+                db_user.get("prestige") or 0,
+                db_user.get("level") or 1,
+                db_user.get("xp") or 0,
+            )
+            self.names[int(user_id)] = db_user.get("name")
+
+        self.keys = sorted(self.key(user_id) for user_id in self.scores)
+
+    def key(self, user_id: int) -> tuple:
+        prestige, level, xp = self.scores[user_id]
+        return -prestige, -level, -xp, user_id
+
+    def set(
+        self,
+        user_id: int,
+        prestige: int = None,
+        level: int = None,
+        xp: int = None,
+        name: str = None,
+    ) -> None:
+        """Replaces the given values of the member"""
+        with self.lock:
+            current = self.scores.get(user_id)
+
+            if current is not None:
+                del self.keys[bisect_left(self.keys, self.key(user_id))]
+            else:
+                current = (0, 1, 0)
+
+            self.scores[user_id] = (
+                current[0] if prestige is None else prestige,
+                current[1] if level is None else level,
+                current[2] if xp is None else xp,
+            )
+            insort(self.keys, self.key(user_id))
+
+            if name is not None or user_id not in self.names:
+                self.names[user_id] = name
+
+    def add(self, user_id: int, prestige: int = 0, level: int = 0, xp: int = 0) -> None:
+        """Adds the given values to the ones of the member"""
+        with self.lock:
+            current = self.scores.get(user_id, (0, 1, 0))
+            self.set(
+                user_id, current[0] + prestige, current[1] + level, current[2] + xp
+            )
+
+    def remove(self, user_id: int) -> None:
+        with self.lock:
+            if user_id in self.scores:
+                del self.keys[bisect_left(self.keys, self.key(user_id))]
+                del self.scores[user_id]
+                self.names.pop(user_id, None)
+
+    def score(self, user_id: int) -> tuple:
+        """Returns the (prestige, level, xp) of the member"""
+        with self.lock:
+            return self.scores.get(user_id, (0, 1, 0))
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """Returns the 1-based rank of the member or None if it isn't ranked"""
+        with self.lock:
+            if user_id not in self.scores:
+                return None
+
+            return bisect_left(self.keys, self.key(user_id)) + 1
+
+    def __iter__(self) -> Iterator[tuple]:
+        """Iterates over the members from the first one as (user_id, name, prestige, level, xp)"""
+        index = 0
+
+        while True:
+            with self.lock:
+                if index >= len(self.keys):
+                    return
+
+                prestige, level, xp, user_id = self.keys[index]
+
+            index += 1
+            yield user_id, self.names.get(user_id), -prestige, -level, -xp
+
+    def top(self, n: int) -> list:
+        with self.lock:
+            return [
+                (user_id, self.names.get(user_id), -prestige, -level, -xp)
+                for prestige, level, xp, user_id in self.keys[:n]
+            ]
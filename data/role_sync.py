@@ -0,0 +1,240 @@
+from asyncio import Semaphore, gather
+from collections import OrderedDict
+from logging import error
+from os import getenv
+from time import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from disnake import Forbidden, Guild, HTTPException, Member, NotFound
+
+# The role ids to add and to remove by member id
+Plan = Dict[int, Tuple[Iterable[int], Iterable[int]]]
+
+
+def roles_diff(
+    member: Member, add: Iterable[int] = (), remove: Iterable[int] = ()
+) -> Optional[Tuple[list, list]]:
+    """Returns the role ids the member really needs to gain and to lose, None if it has nothing to change"""
+    role_ids = {r.id for r in member.roles}
+    add = [_id for _id in add if _id not in role_ids]
+    remove = [_id for _id in remove if _id in role_ids and _id not in add]
+    return (add, remove) if add or remove else None
+
+
+class RoleSyncJob:
+    """Role changes of the members of a guild, applied in the background"""
+
+    __slots__ = (
+        "id",
+        "guild_id",
+        "kind",
+        "plan",
+        "total",
+        "done",
+        "failed",
+        "started",
+        "finished",
+    )
+
+    def __init__(
+        self,
+        _id: str,
+        guild_id: int,
+        kind: str,
+        plan: Plan,
+        total: int = None,
+        done: int = 0,
+        failed: int = 0,
+        started: float = None,
+    ) -> None:
+        self.id = _id
+        self.guild_id = guild_id
+        self.kind = kind
+        # The remaining changes
+        self.plan = plan
+        self.total = len(plan) if total is None else total
+        self.done = done
+        self.failed = failed
+        self.started = started or time()
+        self.finished = None
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "plan": {
+                str(member_id): {"add": list(add), "remove": list(remove)}
+                for member_id, (add, remove) in self.plan.items()
+            },
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "started": self.started,
+        }
+
+    @classmethod
+    def from_dict(cls, _id: str, guild_id: int, job: dict) -> "RoleSyncJob":
+        return cls(
+            _id,
+            guild_id,
+            job["kind"],
+            {
+                int(member_id): (
+                    [int(r) for r in change.get("add") or []],
+                    [int(r) for r in change.get("remove") or []],
+                )
+                for member_id, change in (job.get("plan") or {}).items()
+            },
+            job["total"],
+            job.get("done", 0),
+            job.get("failed", 0),
+            job.get("started"),
+        )
+
+
+class RoleSync:
+    """Applies the role changes of the guild-wide jobs with a bounded concurrency, the jobs are checkpointed to resume after a restart"""
+
+    path = "role_syncs"
+
+    def __init__(self, bot) -> None:
+        self.bot = bot
+        self.model = bot.model
+        # Bounds the in-flight member edits, disnake waits on the rate limit bucket of the route
+        self.semaphore = Semaphore(int(getenv("ROLE_SYNC_CONCURRENCY", 3)))
+        # Number of members applied between two checkpoints
+        self.batch = int(getenv("ROLE_SYNC_BATCH", 50))
+        # Running and last finished jobs by id by guild id
+        self.jobs = {}
+        self.pending = set()
+
+    async def start(self, guild: Guild, kind: str, plan: Plan) -> Optional[RoleSyncJob]:
+        """Checkpoints the job and starts applying it, returns None if there's nothing to change"""
+        plan = {member_id: change for member_id, change in plan.items() if change}
+
+        if not plan:
+            return None
+
+        job = RoleSyncJob(f"{kind}_{int(time() * 1000)}", guild.id, kind, plan)
+        await self.model.run(
+            self.model.update, self.path, args={f"{guild.id}/{job.id}": job.to_dict()}
+        )
+        self.__run(guild, job)
+        return job
+
+    async def restore(self) -> None:
+        """Resumes the checkpointed jobs of the guilds the bot is still in, on_ready runs again after the reconnections so the running jobs are skipped"""
+        checkpoint = await self.model.run(self.model.get, self.path) or {}
+
+        for guild_id, jobs in list(checkpoint.items()):
+            guild = self.bot.get_guild(int(guild_id))
+            running = self.jobs.get(int(guild_id), {})
+
+            for _id, job in list((jobs or {}).items()):
+                if _id in running and not running[_id].finished:
+                    continue
+                elif guild is None:
+                    await self.model.run(
+                        self.model.delete, f"{self.path}/{guild_id}/{_id}"
+                    )
+                else:
+                    self.__run(guild, RoleSyncJob.from_dict(_id, guild.id, job))
+
+    def status(self, guild_id: int) -> list:
+        """Returns the running and last finished jobs of the guild, the oldest first"""
+        return list(self.jobs.get(guild_id, {}).values())
+
+    def __run(self, guild: Guild, job: RoleSyncJob) -> None:
+        jobs = self.jobs.setdefault(guild.id, OrderedDict())
+        jobs[job.id] = job
+
+        # Only the last 5 finished jobs are kept
+        for finished in [j for j in jobs.values() if j.finished][:-5]:
+            del jobs[finished.id]
+
+        task = self.bot.loop.create_task(self.apply(guild, job))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def apply(self, guild: Guild, job: RoleSyncJob) -> None:
+        """Applies the remaining changes batch by batch, each batch is checkpointed"""
+        try:
+            while job.plan:
+                batch = list(job.plan.items())[: self.batch]
+                results = await gather(
+                    *[
+                        self.apply_member(guild, job, member_id, add, remove)
+                        for member_id, (add, remove) in batch
+                    ]
+                )
+                args = {}
+
+                for (member_id, _), success in zip(batch, results):
+                    del job.plan[member_id]
+                    job.done += 1
+                    job.failed += not success
+                    args[f"{guild.id}/{job.id}/plan/{member_id}"] = None
+
+                args[f"{guild.id}/{job.id}/done"] = job.done
+                args[f"{guild.id}/{job.id}/failed"] = job.failed
+                await self.model.run(self.model.update, self.path, args=args)
+
+            await self.model.run(self.model.delete, f"{self.path}/{guild.id}/{job.id}")
+        except Exception as e:
+            return error(
+                f"The role sync {job.id} of the guild {guild.name} ({guild.id}) stopped at {job.done}/{job.total}: {type(e).__name__}: {e}"
+            )
+        finally:
+            job.finished = time()
+
+        if job.failed:
+            await self.bot.utils_class.load_guild(guild)
+            await self.bot.utils_class.send_message_to_mods(
+                f"⚠️ - I couldn't update the roles of `{job.failed}` member(s) out of `{job.total}` during the `{job.kind}` roles sync (maybe some roles are above mine or i don't have the `MANAGE_ROLES` permission)!",
+                guild.id,
+            )
+
+    async def apply_member(
+        self,
+        guild: Guild,
+        job: RoleSyncJob,
+        member_id: int,
+        add: Iterable[int],
+        remove: Iterable[int],
+    ) -> bool:
+        """Adds and removes the roles of the member, returns False if it failed"""
+        async with self.semaphore:
+            try:
+                member = guild.get_member(member_id) or await guild.fetch_member(
+                    member_id
+                )
+            except NotFound:
+                # The member left the guild
+                return True
+
+            # Checked again, the roles may have changed since the job was computed
+            change = roles_diff(member, add, remove)
+
+            if change is None:
+                return True
+
+            # Only the diff is sent so the roles changed meanwhile by others are kept
+            add, remove = (
+                [role for role in map(guild.get_role, roles) if role is not None]
+                for roles in change
+            )
+
+            try:
+                if remove:
+                    await member.remove_roles(*remove, reason=f"{job.kind} roles sync")
+
+                if add:
+                    await member.add_roles(*add, reason=f"{job.kind} roles sync")
+            except Forbidden:
+                return False
+            except HTTPException as e:
+                error(
+                    f"Couldn't edit the roles of the member {member} during the role sync {job.id}: {type(e).__name__}: {e}"
+                )
+                return False
+
+            return True
@@ -0,0 +1,52 @@
+from typing import Dict, FrozenSet, Iterable, Optional
+
+
+def _channels(channels: Optional[Iterable[int]]) -> Optional[FrozenSet[int]]:
+    return None if channels is None else frozenset(channels)
+
+
+class GuildRuntimeConfig:
+    """Lookup structures derived from the configuration of a guild, built once and rebuilt on every change"""
+
+    __slots__ = (
+        "prefix",
+        "prefixes",
+        "moderators",
+        "djs",
+        "commands_channels",
+        "music_channels",
+        "xp_gain_channels",
+        "boosts",
+    )
+
+    def __init__(
+        self, config: dict, moderators: Iterable[int], djs: Iterable[int]
+    ) -> None:
+        self.prefix: str = config.get("prefix") or "o!"
+        self.prefixes = (self.prefix, self.prefix.lower(), self.prefix.upper())
+        # Member and role ids
+        self.moderators = frozenset(moderators)
+        self.djs = frozenset(djs)
+        # None when the commands or the music are allowed in every channel
+        self.commands_channels = _channels(config.get("commands_channels"))
+        self.music_channels = _channels(config.get("music_channels"))
+        # Channel ids by channel type, None when every channel gives xp
+        self.xp_gain_channels: Optional[Dict[str, FrozenSet[int]]] = (
+            None
+            if config.get("xp_gain_channels") is None
+            else {
+                _type: frozenset(channels)
+                for _type, channels in config["xp_gain_channels"].items()
+            }
+        )
+        # Xp bonus in percent by member or role id, in the configuration order
+        self.boosts: Dict[int, int] = {
+            int(_id): bonus
+            for _id, bonus in (config.get("xp", {}).get("boosteds") or {}).items()
+        }
+
+    def allows_commands(self, channel_id: int) -> bool:
+        return self.commands_channels is None or channel_id in self.commands_channels
+
+    def allows_music(self, channel_id: int) -> bool:
+        return self.music_channels is None or channel_id in self.music_channels
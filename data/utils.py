@@ -1,9 +1,12 @@
-from asyncio import sleep
-from collections import OrderedDict
+from asyncio import TimeoutError, create_task, shield, sleep, wait_for
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from logging import error, info, warning
 from math import floor
+from os import getenv
 from re import compile as re_compile
 from re import findall
-from time import time
+from time import monotonic, time
 from typing import Union, List, Optional
 
 from disnake import (
@@ -24,6 +27,15 @@ from disnake.ext.commands.errors import BadArgument
 from disnake.ext.tasks import loop
 
 from bot import Omnitron
+from data.notifications import Delivery, ModsNotifier
+from data.permissions import PermissionCache
+from data.role_sync import RoleSync
+from data.runtime_config import GuildRuntimeConfig
+from data.xp_curve import build_lvl2role_levels
+
+
+# The guild the current database call works on, isolated per task and per thread
+guild_id_context: ContextVar[Optional[int]] = ContextVar("guild_id", default=None)
 
 
 class DurationType(Enum):
@@ -36,74 +48,93 @@ class DurationType(Enum):
 class Utils:
     def __init__(self, bot: Omnitron) -> None:
         self.bot = bot
-
-    async def check_invite(self, ctx: Context):
-        """This method check if the user sent an invitation link to another discord server"""
-        if self.is_mod(ctx.author, ctx.bot):
-            return
+        self.guild_loads = {}
+        # The guilds initialized since the start, their users, polls and tickets are already handled
+        self.initialized_guilds = set()
+        # Readiness futures of the guilds and the events received before their readiness
+        self.guild_ready = {}
+        self.guild_ready_timeout = float(getenv("GUILD_READY_TIMEOUT", 30))
+        self.guild_events = {}
+        self.guild_events_size = int(getenv("GUILD_EVENTS_QUEUE_SIZE", 100))
+        self.guild_idle_ttl = float(getenv("GUILD_IDLE_TTL", 3600))
+        self.eviction_task = None
+        self.permissions = PermissionCache()
+        self.mods_notifier = ModsNotifier(bot)
+        self.role_sync = RoleSync(bot)
+
+    async def check_invite(self, message: Message) -> bool:
+        """This method check if the user sent an invitation link to another discord server, returns True if it did"""
+        if self.is_mod(message.author, self.bot):
+            return False
         regex = re_compile(
             r"(?:https?://)?discord(?:(?:app)?\.com/invite|\.gg)/?[a-zA-Z0-9]+/?"
         )
-        if regex.findall(ctx.message.content):
+        if regex.findall(message.content):
             links = len(
                 [
                     link
-                    for link in self.bot.user_repo.get_invites(
-                        ctx.guild.id, ctx.author.id
+                    for link in await self.bot.user_repo.aio.get_invites(
+                        message.guild.id, message.author.id
                     )
                 ]
             )
-            self.bot.user_repo.new_invite(
-                ctx.guild.id, ctx.author.id, time(), ctx.message.clean_content
+            await self.bot.user_repo.aio.new_invite(
+                message.guild.id, message.author.id, time(), message.clean_content
             )
 
             try:
-                await ctx.message.delete()
+                await message.delete()
             except Forbidden:
                 await self.send_message_to_mods(
-                    f"⚠️ - I don't have the right permissions to manage messages in the channel {ctx.channel.mention} (i tried to delete a message that have an invit to another discord server in it! -> {ctx.message.jump_url})!",
-                    ctx.guild.id,
+                    f"⚠️ - I don't have the right permissions to manage messages in the channel {message.channel.mention} (i tried to delete a message that have an invit to another discord server in it! -> {message.jump_url})!",
+                    message.guild.id,
                 )
 
             try:
-                await self.bot.configs[ctx.guild.id]["prevent_invites"][
+                await self.bot.configs[message.guild.id]["prevent_invites"][
                     "notify_channel"
                 ].send(
-                    f"⚠️ - The member `{ctx.author}` tried to send an invitation link to another discord server in {ctx.channel.mention}! => {ctx.message.clean_content}"
+                    f"⚠️ - The member `{message.author}` tried to send an invitation link to another discord server in {message.channel.mention}! => {message.clean_content}"
                 )
             except Forbidden:
                 await self.send_message_to_mods(
-                    f"⚠️ - I don't have the right permissions to send messages in the channel {self.bot.configs[ctx.guild.id]['prevent_invites']['notify_channel'].mention} (message: `⚠️ - The member `{ctx.author}` tried to send an invitation link to another discord server in {ctx.channel.mention}! => {ctx.message.clean_content}`)!",
-                    ctx.guild.id,
+                    f"⚠️ - I don't have the right permissions to send messages in the channel {self.bot.configs[message.guild.id]['prevent_invites']['notify_channel'].mention} (message: `⚠️ - The member `{message.author}` tried to send an invitation link to another discord server in {message.channel.mention}! => {message.clean_content}`)!",
+                    message.guild.id,
                 )
 
             if links > 1:
-                self.bot.user_repo.warn_user(
-                    ctx.guild.id,
-                    ctx.author.id,
+                await self.bot.user_repo.aio.warn_user(
+                    message.guild.id,
+                    message.author.id,
                     time(),
                     f"{self.bot.user}",
                     "Sent three invitation links to other servers.",
                 )
-                self.bot.user_repo.clear_invites(ctx.guild.id, ctx.author.id)
+                await self.bot.user_repo.aio.clear_invites(
+                    message.guild.id, message.author.id
+                )
 
                 try:
-                    await ctx.send(
-                        f"⚠️ - {ctx.author.mention} - **You've received a warning because you've sent three consecutive invitation links to other discord servers!**",
+                    await message.channel.send(
+                        f"⚠️ - {message.author.mention} - **You've received a warning because you've sent three consecutive invitation links to other discord servers!**",
                         delete_after=30,
                     )
                 except Forbidden as f:
-                    f.text = f"⚠️ - I don't have the right permissions to send messages in the channel {ctx.channel.mention} (message: `⚠️ - {ctx.author.mention} - **You've received a warning because you've sent three consecutive invitation links to other discord servers!**`)!"
+                    f.text = f"⚠️ - I don't have the right permissions to send messages in the channel {message.channel.mention} (message: `⚠️ - {message.author.mention} - **You've received a warning because you've sent three consecutive invitation links to other discord servers!**`)!"
                     raise
             else:
                 try:
-                    await ctx.send(
-                        f"⛔ - {ctx.author.mention} - **Invitation links to other discord servers are not allowed in this server!**, `{'first' if links == 0 else 'second'} warning`!"
+                    await message.channel.send(
+                        f"⛔ - {message.author.mention} - **Invitation links to other discord servers are not allowed in this server!**, `{'first' if links == 0 else 'second'} warning`!"
                     )
                 except Forbidden as f:
-                    f.text = f"⚠️ - I don't have the right permissions to send messages in the channel {ctx.channel.mention} (message: `⛔ - {ctx.author.mention} - **Invitation links to other discord servers are not allowed in this server!**, `{'first' if links == 0 else 'second'} warning`!`)!"
+                    f.text = f"⚠️ - I don't have the right permissions to send messages in the channel {message.channel.mention} (message: `⛔ - {message.author.mention} - **Invitation links to other discord servers are not allowed in this server!**, `{'first' if links == 0 else 'second'} warning`!`)!"
                     raise
 
+            return True
+
+        return False
+
     async def mute_completion(self, db_user: OrderedDict, guild_id: int):
         """This method manage the mute completion"""
         await self.bot.wait_until_ready()
@@ -114,8 +145,8 @@ class Utils:
             and mute["reason"] == "joined the server"
             and db_user["id"] in self.bot.tasks[guild_id]["mute_completions"]
         ):
-            self.bot.user_repo.unmute_user(guild_id, db_user["id"])
-            self.bot.user_repo.clear_join_mutes(guild_id, db_user["id"])
+            await self.bot.user_repo.aio.unmute_user(guild_id, db_user["id"])
+            await self.bot.user_repo.aio.clear_join_mutes(guild_id, db_user["id"])
 
             if "muted_role" in self.bot.configs[guild_id]:
                 try:
@@ -141,7 +172,7 @@ class Utils:
         except Exception:
             return
 
-        self.bot.user_repo.unmute_user(guild_id, db_user["id"])
+        await self.bot.user_repo.aio.unmute_user(guild_id, db_user["id"])
 
         try:
             guild = self.bot.get_guild(guild_id) or await self.bot.fetch_guild(guild_id)
@@ -165,7 +196,7 @@ class Utils:
                 )
 
         if "reason" in mute and mute["reason"] == "joined the server":
-            self.bot.user_repo.clear_join_mutes(guild_id, db_user["id"])
+            await self.bot.user_repo.aio.clear_join_mutes(guild_id, db_user["id"])
 
             if "notify_channel" in self.bot.configs[guild_id]["mute_on_join"]:
                 try:
@@ -219,7 +250,7 @@ class Utils:
 
         reason = f"Unbanned automatically after {self.duration(banned_user['ban']['duration_s'])}"
 
-        self.bot.user_repo.unban_user(
+        await self.bot.user_repo.aio.unban_user(
             guild_id, banned_user["id"], time(), f"{self.bot.user}", reason
         )
 
@@ -240,63 +271,14 @@ class Utils:
         if user and user.id in self.bot.tasks[guild_id]["ban_completions"]:
             del self.bot.tasks[guild_id]["ban_completions"][user.id]
 
-    async def send_message_to_mods(self, message: str, guild_id: int, em: Embed = None):
-        """This method send a message to all mods"""
-        guild = self.bot.get_guild(guild_id) or await self.bot.fetch_guild(guild_id)
+    async def send_message_to_mods(
+        self, message: str, guild_id: int, em: Embed = None
+    ) -> Delivery:
+        """This method send a message to all mods, in the background, the messages without embed are grouped in a digest"""
+        if em is None:
+            return self.mods_notifier.alert(message, guild_id)
 
-        if "mods_channel" in self.bot.configs[guild_id]:
-            try:
-                return await self.bot.configs[guild_id]["mods_channel"].send(
-                    message, embed=em
-                )
-            except Forbidden:
-                message += f"\nAnd also in the channel {self.bot.configs[guild_id]['mods_channel'].mention}!"
-
-        message += f"\n\nIn the guild -> `{guild}` (ID: `{guild_id}`)"
-
-        if self.bot.moderators[guild_id]:
-            for mod in self.bot.moderators[guild_id]:
-                mod = guild.get_role(int(mod))
-
-                if mod:
-                    for m in set(mod.members):
-                        try:
-                            await m.send(message, embed=em)
-                        except Forbidden:
-                            pass
-                else:
-                    try:
-                        mod = guild.get_member(int(mod.id)) or await guild.fetch_member(
-                            int(mod.id)
-                        )
-                        await mod.send(message, embed=em)
-                    except Forbidden or NotFound:
-                        pass
-
-        else:
-            try:
-                guild_owner = guild.owner
-
-                if not guild_owner:
-                    guild_owner = await guild.fetch_member(int(guild.owner_id))
-
-                await guild_owner.send(message, embed=em)
-            except Forbidden or NotFound:
-                bot_owner = self.bot.owner
-
-                if not bot_owner:
-                    bot_owner = await self.bot.fetch_user(
-                        int(
-                            self.bot.owner_id or self.bot.owner_ids[0]
-                            if self.bot.owner_ids
-                            else self.bot.get_ownerid()
-                        )
-                    )
-
-                return await bot_owner.send(
-                    f"{message}\nAnd couldn't send a message to the owner of the server!",
-                    embed=em,
-                )
+        return self.mods_notifier.notify(message, guild_id, em)
 
     def get_embed_from_ctx(self, ctx: Context, title: str) -> Embed:
         em = Embed(
@@ -492,18 +474,8 @@ class Utils:
             return False
 
     def get_guild_pre(self, arg: Union[Message, Member, int]) -> list:
-        try:
-            if isinstance(arg, int):
-                prefix = self.configs[arg]["prefix"]
-            else:
-                prefix = self.configs[arg.guild.id]["prefix"]
-        except AttributeError:
-            if isinstance(arg, int):
-                prefix = self.bot.configs[arg]["prefix"]
-            else:
-                prefix = self.bot.configs[arg.guild.id]["prefix"] or "o!"
-
-        return [prefix, prefix.lower(), prefix.upper()]
+        guild_id = arg if isinstance(arg, int) else arg.guild.id
+        return list(self.bot.runtime_configs[guild_id].prefixes)
 
     async def poll_completion(self, *args):
         await self.bot.wait_until_ready()
@@ -521,7 +493,7 @@ class Utils:
             except Exception:
                 return
 
-        poll = self.bot.poll_repo.get_poll(guild.id, poll["id"])
+        poll = await self.bot.poll_repo.aio.get_poll(guild.id, poll["id"])
 
         if not poll:
             return
@@ -560,7 +532,7 @@ class Utils:
             await poll_msg.edit(content=None, embed=completion_embed, view=[])
 
         del self.bot.configs[guild.id]["polls"][poll["id"]]
-        self.bot.poll_repo.delete_poll(guild.id, poll["id"])
+        await self.bot.poll_repo.aio.delete_poll(guild.id, poll["id"])
 
     @staticmethod
     def to_lower(argument):
@@ -574,15 +546,20 @@ class Utils:
     @staticmethod
     def resolve_guild_path(function):
         def check_guild_path(self, guild_id: int, *args, **kwargs):
-            self.path = f"guilds/{str(guild_id)}/{self.innerpath}"
-            return function(self, guild_id, *args, **kwargs)
+            token = guild_id_context.set(guild_id)
+            try:
+                return function(self, guild_id, *args, **kwargs)
+            finally:
+                guild_id_context.reset(token)
 
         return check_guild_path
 
     @staticmethod
     def check_bot_starting():
         def predicate(source: Union[Context, ApplicationCommandInteraction]):
-            return not source.bot.starting
+            return not source.bot.starting or (
+                source.guild is not None and source.guild.id in source.bot.ready_guilds
+            )
 
         return check(predicate)
 
@@ -625,33 +602,48 @@ class Utils:
 
         return response
 
-    async def init_guild(self, guild: Guild):
-        """DB USERS"""
+    async def init_guild(self, guild: Guild, db_guild: Optional[dict] = None):
+        """Initializes the guild from a snapshot of its database node, only the nodes it needs are read if not given"""
         bot = self.bot
+        # The users missing since the first load are created on their first access
+        reload = db_guild is None and guild.id in self.initialized_guilds
 
-        db_users = bot.user_repo.get_users(guild.id)
-        members = set(
-            [
-                m
-                for m in guild.members
-                if not m.bot and str(m.id) not in set(db_users.keys())
-            ]
-        )
-        for member in members:
-            bot.user_repo.create_user(guild.id, member.id, f"{member}")
+        if db_guild is None:
+            db_guild = await bot.main_repo.aio.get_guild_state(guild.id, reload)
+
+        db_config = db_guild.get("config") or {}
+
+        """ DB USERS """
+
+        db_users = db_guild.get("users") or OrderedDict()
+
+        if not reload:
+            # The users without any of the projected fields aren't in the snapshot, the ids are read apart
+            known = set(await bot.user_repo.aio.get_user_ids(guild.id))
+            members = [m for m in guild.members if not m.bot and m.id not in known]
+            async with bot.user_repo.batch():
+                for member in members:
+                    bot.user_repo.create_user(guild.id, member.id, f"{member}")
 
         """ INIT """
 
-        bot.moderators[guild.id] = [int(k) for k in bot.config_repo.get_moderators(guild.id).keys()] # Initialize moderators list for every guilds
+        bot.moderators[guild.id] = [int(k) for k in (db_config.get("moderators") or {}).keys()] # Initialize moderators list for every guilds
 
-        bot.tasks[guild.id] = {"mute_completions": {}, "ban_completions": {}}
+        # The join mutes completions aren't in the mute completions (they would end at once) but they keep the guild pinned
+        bot.tasks[guild.id] = {
+            "mute_completions": {},
+            "join_mute_completions": {},
+            "ban_completions": {},
+        }
 
         for db_user in db_users.values():
             if "muted" in db_user and db_user["muted"]:
                 if "mutes" in db_user:
                     mute = db_user["mutes"][-1]
                     if "reason" in mute and mute["reason"] == "joined the server":
-                        self.task_launcher(
+                        self.bot.tasks[guild.id]["join_mute_completions"][
+                            db_user["id"]
+                        ] = self.task_launcher(
                             self.mute_completion,
                             (
                                 db_user,
@@ -671,7 +663,7 @@ class Utils:
                             count=1,
                         )
                 else:
-                    bot.user_repo.unmute_user(guild.id, db_user["id"])
+                    await bot.user_repo.aio.unmute_user(guild.id, db_user["id"])
 
             if "ban" in db_user and db_user["ban"]["duration"] != "all Eternity":
                 self.bot.tasks[guild.id]["ban_completions"][
@@ -687,9 +679,9 @@ class Utils:
 
         """ CONFIG """
 
-        bot.configs[guild.id] = {"prefix": bot.config_repo.get_prefix(guild.id)}
+        bot.configs[guild.id] = {"prefix": db_config.get("prefix") or "o!"}
 
-        xp = bot.config_repo.get_xp(guild.id)
+        xp = db_config.get("xp") or OrderedDict()
         bot.configs[guild.id]["xp"] = dict(xp)
 
         if "boosteds" in xp:
@@ -702,6 +694,7 @@ class Utils:
                 int(key): guild.get_role(int(value["role_id"]))
                 for key, value in xp["lvl2role"].items()
             }
+            build_lvl2role_levels(bot.configs[guild.id]["xp"])
 
         if "prestiges" in xp:
             bot.configs[guild.id]["xp"]["prestiges"] = {
@@ -716,7 +709,7 @@ class Utils:
 
         """ MUTE ON JOIN """
 
-        mute_on_join = bot.config_repo.get_mute_on_join(guild.id)
+        mute_on_join = db_config.get("mute_on_join")
         if mute_on_join:
             bot.configs[guild.id]["mute_on_join"] = {
                 "duration": mute_on_join["duration"],
@@ -728,7 +721,7 @@ class Utils:
 
         """ PREVENT INVITES """
 
-        prevent_invites = bot.config_repo.get_invite_prevention(guild.id)
+        prevent_invites = db_config.get("prevent_invites")
         if prevent_invites:
             bot.configs[guild.id]["prevent_invites"] = {"is_on": True}
 
@@ -741,11 +734,11 @@ class Utils:
 
         bot.playlists[guild.id] = []
 
-        bot.djs[guild.id] = [int(k) for k in bot.config_repo.get_djs(guild.id).keys()] # Initialize djs list for every guilds
+        bot.djs[guild.id] = [int(k) for k in (db_config.get("djs") or {}).keys()] # Initialize djs list for every guilds
 
         """ COMMANDS CHANNELS """
 
-        commands_channels = bot.config_repo.get_commands_channels(guild.id)
+        commands_channels = db_config.get("commands_channels")
         if commands_channels:
             bot.configs[guild.id]["commands_channels"] = [
                 int(c) for c in commands_channels.keys()
@@ -753,7 +746,7 @@ class Utils:
 
         """ MUSIC CHANNELS """
 
-        music_channels = bot.config_repo.get_music_channels(guild.id)
+        music_channels = db_config.get("music_channels")
         if music_channels:
             bot.configs[guild.id]["music_channels"] = [
                 int(c) for c in music_channels.keys()
@@ -761,7 +754,7 @@ class Utils:
 
         """ XP GAIN """
 
-        xp_gain_channels = bot.config_repo.get_xp_gain_channels(guild.id)
+        xp_gain_channels = db_config.get("xp_gain_channels")
         if xp_gain_channels:
             bot.configs[guild.id]["xp_gain_channels"] = {}
             text_channels = []
@@ -783,13 +776,13 @@ class Utils:
 
         """ POLLS """
 
-        polls_channel = bot.config_repo.get_polls_channel(guild.id)
+        polls_channel = db_config.get("polls_channel")
         if polls_channel:
             bot.configs[guild.id]["polls_channel"] = guild.get_channel(
                 int(polls_channel)
             )
 
-        polls = bot.poll_repo.get_polls(guild.id)
+        polls = db_guild.get("polls") or OrderedDict()
         if len(polls) > 1 or polls and "old" not in polls:
             bot.configs[guild.id]["polls"] = {}
             for poll in polls:
@@ -801,7 +794,7 @@ class Utils:
 
         """ TICKETS """
 
-        tickets = bot.config_repo.get_tickets(guild.id)
+        tickets = db_config.get("tickets")
         if tickets:
             bot.configs[guild.id]["tickets"] = {
                 "tickets_channel": guild.get_channel(
@@ -812,17 +805,17 @@ class Utils:
                 ),
             }
 
-        tickets = bot.ticket_repo.get_tickets(guild.id)
+        tickets = db_guild.get("tickets")
         if tickets:
             for ticket in tickets:
                 try:
                     _ = guild.get_channel(ticket) or await guild.fetch_channel(ticket)
                 except NotFound:
-                    bot.ticket_repo.delete_ticket(guild.id, ticket)
+                    await bot.ticket_repo.aio.delete_ticket(guild.id, ticket)
 
         """ SELECT TO ROLE """
 
-        select2role = bot.config_repo.get_select2role(guild.id)
+        select2role = db_config.get("select2role")
         if select2role:
             bot.configs[guild.id]["select2role"] = {}
 
@@ -848,16 +841,187 @@ class Utils:
 
         """ MUTED ROLE """
 
-        muted_role = bot.config_repo.get_muted_role(guild.id)
+        muted_role = db_config.get("muted_role")
         if muted_role:
             bot.configs[guild.id]["muted_role"] = guild.get_role(int(muted_role))
 
         """ MODS CHANNEL """
 
-        mods_channel = bot.config_repo.get_mods_channel(guild.id)
+        mods_channel = db_config.get("mods_channel_id")
         if mods_channel:
             bot.configs[guild.id]["mods_channel"] = guild.get_channel(int(mods_channel))
 
+        self.build_runtime_config(guild.id)
+
+        self.initialized_guilds.add(guild.id)
+        bot.ready_guilds.add(guild.id)
+        bot.guild_last_access[guild.id] = monotonic()
+
+        future = self.guild_ready.get(guild.id)
+        if future is not None and not future.done():
+            future.set_result(True)
+
+    def build_runtime_config(self, guild_id: int):
+        """(Re)builds the lookup structures of the guild from its configuration, to call after every change of it"""
+        previous = self.bot.runtime_configs.get(guild_id)
+        config = self.bot.runtime_configs[guild_id] = GuildRuntimeConfig(
+            self.bot.configs[guild_id],
+            self.bot.moderators[guild_id],
+            self.bot.djs[guild_id],
+        )
+
+        if (
+            previous is None
+            or previous.moderators != config.moderators
+            or previous.djs != config.djs
+        ):
+            self.permissions.invalidate(guild_id)
+
+    async def load_guild(self, guild: Guild, db_guild: Optional[dict] = None):
+        """Materializes the state of the guild on its first access, concurrent calls share the same load"""
+        self.bot.guild_last_access[guild.id] = monotonic()
+
+        if guild.id in self.bot.ready_guilds:
+            return
+
+        if guild.id not in self.guild_loads:
+            self.guild_loads[guild.id] = create_task(self.init_guild(guild, db_guild))
+            self.guild_loads[guild.id].add_done_callback(
+                lambda _: self.guild_loads.pop(guild.id, None)
+            )
+
+        await shield(self.guild_loads[guild.id])
+
+    async def wait_guild_ready(self, guild_id: int, timeout: float = None) -> bool:
+        """Waits until the state of the guild is loaded, returns False if it isn't after the timeout"""
+        if guild_id in self.bot.ready_guilds:
+            return True
+
+        future = self.guild_ready.get(guild_id)
+
+        if future is None or future.done():
+            future = self.guild_ready[guild_id] = self.bot.loop.create_future()
+
+        try:
+            await wait_for(shield(future), timeout or self.guild_ready_timeout)
+        except TimeoutError:
+            return False
+
+        return True
+
+    def queue_guild_event(
+        self, guild: Guild, event_name: str, args: tuple, kwargs: dict
+    ):
+        """Keeps the event until the guild is loaded, the oldest events are dropped when its queue is full"""
+        events = self.guild_events.get(guild.id)
+
+        if events is None:
+            events = self.guild_events[guild.id] = deque(maxlen=self.guild_events_size)
+            self.bot.loop.create_task(self.dispatch_guild_events(guild))
+        elif len(events) == events.maxlen:
+            warning(
+                f"Too many events received before the guild {guild.name} ({guild.id}) is loaded, the event {events[0][0]} is dropped"
+            )
+
+        events.append((event_name, args, kwargs))
+
+    async def dispatch_guild_events(self, guild: Guild):
+        """Loads the guild then dispatches the events it received in the meantime, in order"""
+        try:
+            await self.load_guild(guild)
+        except Exception as e:
+            events = self.guild_events.pop(guild.id, ())
+            return error(
+                f"Couldn't load the guild {guild.name} ({guild.id}), {len(events)} event(s) dropped: {type(e).__name__}: {e}"
+            )
+
+        for event_name, args, kwargs in self.guild_events.pop(guild.id, ()):
+            self.bot.dispatch(event_name, *args, **kwargs)
+
+    def unload_guild(self, guild_id: int):
+        """Releases the state of the guild, it will be loaded again on its next access"""
+        self.bot.ready_guilds.discard(guild_id)
+        self.guild_ready.pop(guild_id, None)
+        self.bot.guild_last_access.pop(guild_id, None)
+
+        for states in (
+            self.bot.configs,
+            self.bot.runtime_configs,
+            self.bot.moderators,
+            self.bot.djs,
+            self.bot.playlists,
+            self.bot.tasks,
+        ):
+            states.pop(guild_id, None)
+
+        self.permissions.invalidate(guild_id)
+        self.bot.user_repo.cache.invalidate(guild_id)
+        self.bot.user_repo.rankings.pop(guild_id, None)
+        self.bot.user_repo.xp.unload(guild_id)
+        self.bot.user_repo.voice.end_guild(guild_id)
+
+    def is_guild_pinned(self, guild_id: int) -> bool:
+        """Checks if the guild has running timers or members in voice channels and must stay loaded"""
+        timers = list(
+            (self.bot.configs.get(guild_id, {}).get("polls") or {}).values()
+        ) + [
+            task
+            for tasks in self.bot.tasks.get(guild_id, {}).values()
+            for task in tasks.values()
+        ]
+
+        if any(task.is_running() for task in timers) or self.bot.playlists.get(
+            guild_id
+        ):
+            return True
+
+        guild = self.bot.get_guild(guild_id)
+
+        return guild is not None and (
+            guild.voice_client is not None
+            or any(
+                not m.bot for channel in guild.voice_channels for m in channel.members
+            )
+        )
+
+    async def evict_idle_guilds(self):
+        """Unloads the guilds that haven't been accessed during the idle time to live"""
+        now = monotonic()
+        evicted = 0
+
+        for guild_id in list(self.bot.ready_guilds):
+            if now - self.bot.guild_last_access.get(
+                guild_id, 0
+            ) < self.guild_idle_ttl or self.is_guild_pinned(guild_id):
+                continue
+
+            self.unload_guild(guild_id)
+            evicted += 1
+
+        if evicted:
+            info(
+                f"{evicted} idle guild(s) unloaded, {len(self.bot.ready_guilds)} guild(s) loaded"
+            )
+
+        self.log_stats()
+
+    def log_stats(self):
+        """Logs the hit rates of the caches and the average durations of the message stages"""
+        permissions = self.permissions.stats()
+        stages = ", ".join(
+            f"{name} {stage['avg_ms']:.2f}ms ({stage['calls']})"
+            for name, stage in self.bot.pipeline.stats().items()
+        )
+        info(
+            f"Users cache hit rate: {self.bot.user_repo.cache.hit_rate:.1%}, permissions cache hit rate: {permissions['hit_rate']:.1%} ({permissions['size']} member(s)), message stages: {stages or 'none'}"
+        )
+
+    def start_guilds_eviction(self):
+        if self.eviction_task is None and self.guild_idle_ttl > 0:
+            self.eviction_task = self.task_launcher(
+                self.evict_idle_guilds, (), seconds=min(self.guild_idle_ttl, 300)
+            )
+
     @classmethod
     def check_moderator(cls):
         def predicate(source: Union[Context, ApplicationCommandInteraction]):
@@ -887,20 +1051,15 @@ class Utils:
 
     @staticmethod
     def is_mod(member: Member, bot: Omnitron) -> bool:
-        return (
-            set(r.id for r in member.roles) & set(bot.moderators[member.guild.id])
-            or member.id in set(bot.moderators[member.guild.id])
-            or member.guild_permissions.administrator
-        )
+        return bot.utils_class.permissions.resolve(
+            member, bot.runtime_configs[member.guild.id]
+        )[0]
 
     @staticmethod
     def is_dj(member: Member, bot: Omnitron) -> bool:
-        return (
-            not bot.djs[member.guild.id]
-            or set(r.id for r in member.roles) & set(bot.djs[member.guild.id])
-            or member.id in set(bot.djs[member.guild.id])
-            or member.guild_permissions.administrator
-        )
+        return bot.utils_class.permissions.resolve(
+            member, bot.runtime_configs[member.guild.id]
+        )[1]
 
     @staticmethod
     async def mentionable_converter(
@@ -1,8 +1,10 @@
 from disnake import Forbidden, Role, Member
 from math import floor, ceil
 from random import randint
+from typing import Tuple
 
 from bot import Omnitron
+from data.xp_curve import get_curve, get_level_role
 
 
 class Xp_class:
@@ -54,32 +56,28 @@ class Xp_class:
                 raise
 
     async def manage_levels(self, member: Member, level: int, _type: str = ""):
-        if "lvl2role" in self.bot.configs[member.guild.id]["xp"]:
-            for key in sorted(
-                self.bot.configs[member.guild.id]["xp"]["lvl2role"], reverse=True
-            ):
-                if level >= key:
-                    if self.bot.configs[member.guild.id]["xp"]["lvl2role"][
-                        key
-                    ] not in set(member.roles):
-                        await self.new_level_role(
-                            member,
-                            self.bot.configs[member.guild.id]["xp"]["lvl2role"][key],
-                            _type,
-                        )
-                    break
+        role = get_level_role(self.bot.configs[member.guild.id]["xp"], level)
+
+        if role is not None and role not in member.roles:
+            await self.new_level_role(member, role, _type)
+
+    def level_roles_diff(self, member: Member, level: int) -> Tuple[list, list]:
+        """Returns the role ids to add to and to remove from the member for it to have the role of its level, as manage_levels would do"""
+        xp_config = self.bot.configs[member.guild.id]["xp"]
+        role = get_level_role(xp_config, level)
+
+        if role is None or role in member.roles:
+            return [], []
+
+        return [role.id], [
+            r.id for r in member.roles if r in xp_config["lvl2role"].values()
+        ]
 
     def calculate_bonus(self, member: Member, value: int):
-        member_roles = set([str(r.id) for r in member.roles])
-        for _id in self.bot.configs[member.guild.id]["xp"]["boosteds"]:
-            if str(member.id) == _id or _id in member_roles:
-                value = floor(
-                    value
-                    * (
-                        1
-                        + self.bot.configs[member.guild.id]["xp"]["boosteds"][_id] / 100
-                    )
-                )
+        member_ids = {member.id, *(r.id for r in member.roles)}
+        for _id, bonus in self.bot.runtime_configs[member.guild.id].boosts.items():
+            if _id in member_ids:
+                value = floor(value * (1 + bonus / 100))
         return value
 
     async def manage_xp(self, member: Member, _type: str):
@@ -89,7 +87,14 @@ class Xp_class:
         ):
             return
 
-        db_user = self.bot.user_repo.get_user(member.guild.id, member.id)
+        await self.award_xp(member, _type)
+
+    async def award_xp(self, member: Member, _type: str):
+        """Gives the xp of a message or of a voice interval to the member, the eligibility must be checked beforehand"""
+        if not self.bot.user_repo.xp.is_loaded(member.guild.id, member.id):
+            await self.bot.user_repo.aio.load_xp(member.guild.id, member.id)
+
+        prestige, level, _ = self.bot.user_repo.xp.get(member.guild.id, member.id)
 
         if _type == "vocal":
             xp_gain = floor(randint(15, 25))
@@ -102,7 +107,7 @@ class Xp_class:
             xp_gain
             * (
                 1
-                + ((db_user["prestige"] if "prestige" in db_user else 0) * 10)
+                + (prestige * 10)
                 / int(self.bot.configs[member.guild.id]["xp"]["max_lvl"])
             )
         )
@@ -110,70 +115,45 @@ class Xp_class:
         if self.have_xp_bonus(member):
             xp_gain = self.calculate_bonus(member, xp_gain)
 
-        if (db_user["xp"] + xp_gain) < 5 * (db_user["level"] ^ 2) + 50 * db_user[
-            "level"
-        ] + 100 or db_user["level"] == int(
-            self.bot.configs[member.guild.id]["xp"]["max_lvl"]
-        ):
-            self.bot.user_repo.add_xp(member.guild.id, member.id, xp_gain)
-        else:
-            self.bot.user_repo.clear_xp(member.guild.id, member.id)
-            self.bot.user_repo.add_levels(member.guild.id, member.id, 1)
-
+        if self.bot.user_repo.award_xp(member.guild.id, member.id, xp_gain):
             if "notify_channel" in self.bot.configs[member.guild.id]["xp"]:
                 msg = f"⚠️ - Message not defined for the event {_type} ! - ⚠️"
 
                 try:
-                    if db_user["level"] + 1 == int(
+                    if level + 1 == int(
                         self.bot.configs[member.guild.id]["xp"]["max_lvl"]
                     ):
                         msg = f"🎉 - {member.mention} - You've just reached level `int({self.bot.configs[member.guild.id]['xp']['max_lvl']})`, you have reached the maximum level! You can now pass a prestige with the command `{self.bot.utils_class.get_guild_pre(member)[0]}prestige`! - 🎉"
                     else:
-                        msg = f"🎉 - {member.mention} - You've just passed to the level `{db_user['level'] + 1}`! - 🎉"
+                        msg = f"🎉 - {member.mention} - You've just passed to the level `{level + 1}`! - 🎉"
                 except Forbidden as f:
                     f.text = f"⚠️ - I don't have the right permissions to send messages in the channel {self.bot.configs[member.guild.id]['xp'].mention} (message: `{msg}`)!"
                     raise
 
-            await self.manage_levels(member, db_user["level"] + 1, "new_lvl")
+            await self.manage_levels(member, level + 1, "new_lvl")
 
     async def manage_prestige(self, member: Member, _type: str):
         db_user = self.bot.user_repo.get_user(member.guild.id, member.id)
 
-        xp = db_user["xp"]
-        if _type == "removed_prestige":
-            for lvl in range(1, int(db_user["level"])):
-                xp += 5 * (lvl ^ 2) + 50 * lvl + 100
-
-            self.bot.user_repo.remove_prestige(member.guild.id, member.id, xp)
-        elif _type == "added_prestige":
-            level = 1
-            for lvl in range(1, int(db_user["level"])):
-                xp -= 5 * (lvl ^ 2) + 50 * lvl + 100
+        curve = get_curve(self.bot.configs[member.guild.id]["xp"]["max_lvl"])
 
-                if xp < 0:
-                    break
-                elif level < self.bot.configs[member.guild.id]["xp"]["max_lvl"]:
-                    level += 1
-
-            self.bot.user_repo.add_prestige(
+        if _type == "removed_prestige":
+            self.bot.user_repo.remove_prestige(
                 member.guild.id,
                 member.id,
-                1,
-                level,
-                xp + (5 * (lvl ^ 2) + 50 * lvl + 100),
+                curve.total_xp(int(db_user["level"]), db_user["xp"]),
             )
+        elif _type == "added_prestige":
+            level, xp = curve.from_total_xp(db_user["xp"])
+            self.bot.user_repo.add_prestige(member.guild.id, member.id, 1, level, xp)
         elif _type == "purged_prestiges":
-            for prestige in range(0, int(db_user["prestige"])):
-                for lvl in range(
-                    1,
-                    self.bot.configs[member.guild.id]["xp"]["max_lvl"]
-                    if prestige >= 1
-                    else int(db_user["level"]),
-                ):
-                    xp += 5 * (lvl ^ 2) + 50 * lvl + 100
-
             self.bot.user_repo.remove_prestige(
-                member.guild.id, member.id, xp, db_user["prestige"]
+                member.guild.id,
+                member.id,
+                curve.purged_xp(
+                    int(db_user["prestige"]), int(db_user["level"]), db_user["xp"]
+                ),
+                db_user["prestige"],
             )
 
         await self.manage_levels(
@@ -183,9 +163,5 @@ class Xp_class:
         )
 
     def have_xp_bonus(self, member: Member) -> bool:
-        if "boosteds" not in self.bot.configs[member.guild.id]["xp"]:
-            return False
-
-        return set([str(r.id) for r in member.roles]) & set(
-            self.bot.configs[member.guild.id]["xp"]["boosteds"]
-        ) or str(member.id) in set(self.bot.configs[member.guild.id]["xp"]["boosteds"])
+        boosts = self.bot.runtime_configs[member.guild.id].boosts
+        return member.id in boosts or any(r.id in boosts for r in member.roles)
@@ -0,0 +1,68 @@
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from disnake import Role
+
+
+def xp_to_next_level(level: int) -> int:
+    """Returns the xp needed to pass from the level to the next one"""
+    return 5 * (level ^ 2) + 50 * level + 100
+
+
+class XpCurve:
+    """Cumulative xp tables of the levels of a guild, for a given max level"""
+
+    def __init__(self, max_lvl: int) -> None:
+        self.max_lvl = max_lvl
+        # totals[lvl] is the xp needed to go from the level 1 to the level lvl
+        self.totals = [0, 0]
+
+        for lvl in range(1, max_lvl):
+            self.totals.append(self.totals[-1] + xp_to_next_level(lvl))
+
+    @property
+    def prestige_xp(self) -> int:
+        """The xp needed to go from the level 1 to the max level"""
+        return self.totals[self.max_lvl]
+
+    def total_xp(self, level: int, xp: int = 0) -> int:
+        """Returns the xp accumulated since the level 1 by a member at this level with this xp"""
+        return self.totals[min(max(level, 1), self.max_lvl)] + xp
+
+    def from_total_xp(self, total: int) -> Tuple[int, int]:
+        """Returns the (level, xp) reached with this total xp accumulated since the level 1"""
+        level = bisect_right(self.totals, max(total, 0), 1, self.max_lvl + 1) - 1
+        return level, total - self.totals[level]
+
+    def purged_xp(self, prestige: int, level: int, xp: int) -> int:
+        """Returns the xp accumulated since the level 1 of the first prestige"""
+        if prestige <= 0:
+            return xp
+
+        return self.total_xp(level, xp) + (prestige - 1) * self.prestige_xp
+
+
+@lru_cache(maxsize=32)
+def get_curve(max_lvl: int) -> XpCurve:
+    """Returns the shared xp curve of the max level, it is only built once"""
+    return XpCurve(int(max_lvl))
+
+
+def build_lvl2role_levels(xp_config: dict) -> None:
+    """Rebuilds the sorted thresholds of the level to role list of a guild xp config, must be called on every change of it"""
+    if xp_config.get("lvl2role"):
+        xp_config["lvl2role_levels"] = sorted(xp_config["lvl2role"])
+    else:
+        xp_config.pop("lvl2role_levels", None)
+
+
+def get_level_role(xp_config: dict, level: int) -> Optional[Role]:
+    """Returns the role of the highest level to role threshold reached by the level"""
+    levels = xp_config.get("lvl2role_levels")
+
+    if not levels:
+        return None
+
+    index = bisect_right(levels, level)
+    return xp_config["lvl2role"][levels[index - 1]] if index else None